@@ -1,13 +1,21 @@
 from datasets import load_dataset
 import json
 
+try:
+    import orjson
+
+    def dumps_line(item):
+        return orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    def dumps_line(item):
+        return (json.dumps(item) + "\n").encode()
+
 # Загружаем Python-подмножество
 dataset = load_dataset("bigcode/humanevalpack", split="test")
 
 # Сохраняем в файл humanevalpack_python.jsonl в текущей папке
-with open("humanevalpack_python.jsonl", "w") as f:
-    for item in dataset:
-        # Каждая строка — отдельный JSON объект
-        f.write(json.dumps(item) + "\n")
+# Каждая строка — отдельный JSON объект
+with open("humanevalpack_python.jsonl", "wb") as f:
+    f.writelines(dumps_line(item) for item in dataset)
 
 print("Сохранено в humanevalpack_python.jsonl")
@@ -1,24 +1,51 @@
 import argparse
-import json
 import datetime
+import functools
+import logging
 import sys
 import os
 
 # Add src to path so we can import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from workflows.main_agent import CodeFixingAgent
+# workflows.main_agent pulls in torch/transformers; it is imported
+# only once the arguments have been validated, so --help and bad input stay fast
+from core.dataset import load_task
 
 
+@functools.lru_cache(maxsize=256)
 def load_dataset_task(data_path: str, task_id: str):
-    """Load a specific task from HumanEvalFix dataset."""
-    with open(data_path, 'r') as f:
-        for line in f:
-            if line.strip():
-                task = json.loads(line)
-                if task['task_id'] == task_id:
-                    return task
-    raise ValueError(f"Task {task_id} not found in dataset")
+    """Load a specific task from HumanEvalFix dataset (cached; treat as read-only)."""
+    task = load_task(data_path, task_id)
+    if task is None:
+        raise ValueError(f"Task {task_id} not found in dataset")
+    return task
+
+
+# Per-attempt debug block, rendered with format_map instead of a chain of prints
+ATTEMPT_TEMPLATE = (
+    "\n--- Attempt {attempt_num} - {status} ---\n"
+    "Strategy: {strategy_used}\n"
+    "{reasoning}"
+    "\nCandidate Code:\n"
+    "{candidate_code}\n"
+    "{error_log}"
+    + "-" * 50
+)
+
+
+def format_attempt(h: dict) -> str:
+    """Render one attempt record for the debugging trace."""
+    test_result = h.get('test_result', {})
+    passed = test_result.get('passed')
+    return ATTEMPT_TEMPLATE.format_map({
+        'attempt_num': h.get('attempt_num', '?'),
+        'status': 'PASSED' if passed else 'FAILED',
+        'strategy_used': h.get('strategy_used', 'unknown'),
+        'reasoning': f"Reasoning:\n{h['reasoning']}\n" if h.get('reasoning') else "",
+        'candidate_code': h.get('candidate_code', 'No code'),
+        'error_log': "" if passed else f"\nError Log:\n{test_result.get('log', 'No error log')}\n"
+    })
 
 
 if __name__ == "__main__":
@@ -31,11 +58,24 @@ if __name__ == "__main__":
     p.add_argument("--task-range", help="Task range for batch mode (e.g., '0-9' or '5-15')")
     p.add_argument("--max-tasks", type=int, help="Maximum number of tasks to evaluate in batch mode")
     p.add_argument("--experiments-dir", help="Directory to save experiments (default: ./experiments)")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes for batch mode (each loads its own model)")
+    p.add_argument("--generation-batch-size", type=int, default=1, help="Batch mode: generate first LLM attempts for this many tasks per model call")
+    p.add_argument("--num-candidates", type=int, default=1, help="Single mode: fixes sampled per LLM attempt, all of them tested")
+    p.add_argument("--reuse-interpreter", action="store_true", help="Single mode: test candidates in a persistent worker interpreter instead of a fresh python per run")
+    p.add_argument("--verbose", action="store_true", help="Print every attempt's reasoning, code and error log, plus code previews while running")
+    p.add_argument("--chunk-size", type=int, help="Batch mode: evaluate only one byte window of this size of the dataset file")
+    p.add_argument("--chunk-idx", type=int, default=0, help="Index of the byte window to evaluate with --chunk-size")
     a = p.parse_args()
+    
+    # The agent reports progress through logging; show it as plain lines
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if a.verbose:
+        logging.getLogger("workflows").setLevel(logging.DEBUG)
+
+    today = datetime.datetime.now()
+    day_str = today.strftime("%d")
 
     if a.mode == "single":
-        today = datetime.datetime.now()
-        day_str = today.strftime("%d")
         exp_name = f"demo_{day_str}_{a.exp_num}"
         
         if a.task_id:
@@ -55,6 +95,7 @@ if __name__ == "__main__":
             task_prompt = "Fix the multiplication function that incorrectly uses addition."
         
         # Create agent and run single task
+        from workflows.main_agent import CodeFixingAgent
         base_dir = a.experiments_dir if hasattr(a, 'experiments_dir') and a.experiments_dir else None
         agent = CodeFixingAgent(base_dir=base_dir)
         result = agent.fix_code(
@@ -62,7 +103,9 @@ if __name__ == "__main__":
             tests=tests,
             task_id=exp_name,
             task_prompt=task_prompt,
-            max_attempts=a.max_attempts
+            max_attempts=a.max_attempts,
+            num_candidates=a.num_candidates,
+            reuse_interpreter=a.reuse_interpreter
         )
         
         print("Final status:", result["final_status"])
@@ -71,27 +114,24 @@ if __name__ == "__main__":
         print("Total time:", f"{result.get('total_time', 0):.2f}s")
         print("LLM calls:", result.get('llm_calls', 0))
         
-        # Show attempt details if available
+        # Save attempt details to the task directory; print them only with --verbose
         if result.get("attempts"):
-            print("\n=== DEBUGGING ATTEMPTS AND REASONING ===")
-            for h in result["attempts"]:
-                test_result = h.get('test_result', {})
-                print(f"\n--- Attempt {h.get('attempt_num', '?')} - {'PASSED' if test_result.get('passed') else 'FAILED'} ---")
-                print(f"Strategy: {h.get('strategy_used', 'unknown')}")
-                if h.get('reasoning'):
-                    print("Reasoning:")
-                    print(h['reasoning'])
-                print("\nCandidate Code:")
-                print(h.get('candidate_code', 'No code'))
-                if not test_result.get('passed'):
-                    print("\nError Log:")
-                    print(test_result.get('log', 'No error log'))
-                print("-" * 50)
+            trace = "=== DEBUGGING ATTEMPTS AND REASONING ===\n" + "\n".join(
+                format_attempt(h) for h in result["attempts"]
+            )
+            trace_file = os.path.join(result["task_dir"], "attempts.log")
+            with open(trace_file, "w") as f:
+                f.write(trace + "\n")
+            if a.verbose:
+                print("\n" + trace)
+            else:
+                print(f"\nAttempt details saved to {trace_file} (use --verbose to print them)")
             
             # Print pass@1 and pass@k metrics
             attempts = result["attempts"]
             pass_at_1 = 1 if attempts and attempts[0].get('test_result', {}).get('passed') else 0
-            pass_at_k = 1 if any(a.get('test_result', {}).get('passed') for a in attempts) else 0
+            # The agent stops at the first passing attempt, so "solved" is pass@k
+            pass_at_k = 1 if result["final_status"] == "solved" else 0
             print(f"\n=== METRICS ===")
             print(f"pass@1: {pass_at_1}")
             print(f"pass@k: {pass_at_k}")
@@ -108,6 +148,14 @@ if __name__ == "__main__":
         # Batch mode - evaluate on dataset
         subset_size = a.max_tasks
         task_range = None
+        byte_range = None
+        output_path = "experiments/results.json"
+        
+        # Byte-window chunking lets independent jobs split one large dataset file
+        if a.chunk_size:
+            byte_range = (a.chunk_size * a.chunk_idx, a.chunk_size * (a.chunk_idx + 1))
+            output_path = f"experiments/results_chunk{a.chunk_idx}.json"
+            print(f"Chunk {a.chunk_idx}: bytes {byte_range[0]} to {byte_range[1]}")
         
         # Parse task range if provided
         if a.task_range:
@@ -120,7 +168,7 @@ if __name__ == "__main__":
                 sys.exit(1)
         
         # Interactive input if no command line options
-        if not subset_size and not task_range:
+        if not subset_size and not task_range and not byte_range:
             choice = input("Choose evaluation mode:\n1. Specify task range (e.g., 0-9)\n2. Specify max tasks\n3. Full dataset\nChoice (1/2/3): ").strip()
             
             if choice == "1":
@@ -141,23 +189,27 @@ if __name__ == "__main__":
             print(f"Evaluating tasks {task_range[0]} to {task_range[1]}")
         elif subset_size:
             print(f"Evaluating max {subset_size} tasks")
-        else:
+        elif not byte_range:
             print("Evaluating full dataset")
         
         print(f"Max attempts per task: {a.max_attempts}")
         
         # Create agent and run evaluation
+        from workflows.main_agent import CodeFixingAgent
         base_dir = a.experiments_dir if hasattr(a, 'experiments_dir') and a.experiments_dir else None
         agent = CodeFixingAgent(base_dir=base_dir)
         results = agent.evaluate_on_dataset(
             a.data, 
-            "experiments/results.json", 
+            output_path, 
             max_problems=subset_size,
             task_range=task_range,
-            max_attempts=a.max_attempts
+            max_attempts=a.max_attempts,
+            max_workers=a.workers,
+            byte_range=byte_range,
+            generation_batch_size=a.generation_batch_size
         )
         
-        print(f"\nEvaluation complete! Results saved to experiments/results.json")
+        print(f"\nEvaluation complete! Results saved to {output_path}")
         print(f"Pass rate: {results.get('pass_rate', 0):.3f}")
         print(f"Problems solved: {results.get('solved', 0)}/{results.get('total_problems', 0)}")
         print(f"Average attempts: {results.get('avg_attempts', 0):.1f}")
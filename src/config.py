@@ -21,7 +21,7 @@ class Config:
     
     # Device configuration
     DEVICE = "auto"  # Will use GPU if available
-    USE_8BIT = True  # Use 8-bit quantization for efficiency
+    MODEL_PRECISION = "auto"  # bf16 on GPUs with >= 8 GB, else 4-bit NF4; or "bf16", "nf4", "int8"
     
     @classmethod
     def setup_paths(cls, base_path=None):
@@ -46,5 +46,5 @@ class Config:
             'top_k': cls.TOP_K,
             'top_p': cls.TOP_P,
             'device': cls.DEVICE,
-            'use_8bit': cls.USE_8BIT
+            'precision': cls.MODEL_PRECISION
         }
\ No newline at end of file
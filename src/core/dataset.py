@@ -0,0 +1,194 @@
+"""
+Streaming helpers for the HumanEvalPack JSONL dataset.
+"""
+import json
+import mmap
+import os
+import pickle
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson parses bytes directly and is several times faster than stdlib json
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Read size for files that cannot be memory-mapped
+_READ_CHUNK = 1 << 16
+
+
+# Leading bytes that may start a whitespace-only line
+_WHITESPACE = frozenset(b' \t\r\x0b\x0c')
+
+
+def _is_blank(line) -> bool:
+    """
+    Blank lines are empty or whitespace-only. A record starts with "{", so
+    only lines that open with whitespace are stripped.
+    """
+    return len(line) == 0 or (line[0] in _WHITESPACE and not line.strip())
+
+
+def _iter_jsonl_chunked(fd: int, byte_start: int = 0,
+                        byte_end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Same contract as iter_jsonl_mmap for files that cannot be mapped (pipes,
+    special files): read 64KB chunks and split them on newlines, carrying the
+    trailing partial line over to the next chunk.
+    """
+    end_limit = float('inf') if byte_end is None else byte_end
+    pos = 0
+    residual = b''
+    while pos < end_limit:
+        chunk = os.read(fd, _READ_CHUNK)
+        if not chunk:
+            break
+        lines = (residual + chunk).split(b'\n')
+        residual = lines.pop()
+        for line in lines:
+            if pos >= end_limit:
+                return
+            if pos >= byte_start and not _is_blank(line):
+                yield pos, line
+            pos += len(line) + 1
+    if residual and byte_start <= pos < end_limit and not _is_blank(residual):
+        yield pos, residual
+
+
+def iter_jsonl_mmap(path: str, byte_start: int = 0,
+                    byte_end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (byte_offset, raw_line) for every non-empty line of a JSONL file.
+
+    The file is memory-mapped and split on newlines with mm.find, so lines are
+    sliced straight out of the page cache without text decoding.
+
+    With a byte range, only lines whose first byte falls in [byte_start,
+    byte_end) are yielded: a line straddling byte_start belongs to the
+    previous range, so consecutive ranges partition the file exactly.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        try:
+            mm = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+        except (OSError, ValueError):
+            # Empty files, pipes and special files cannot be mapped
+            yield from _iter_jsonl_chunked(fd, byte_start, byte_end)
+            return
+        with mm:
+            end_limit = size if byte_end is None else min(byte_end, size)
+            pos = byte_start
+            if 0 < pos < size and mm[pos - 1] != 0x0A:
+                # Skip the partial line owned by the previous range
+                nl = mm.find(b'\n', pos)
+                pos = size if nl == -1 else nl + 1
+            while pos < end_limit:
+                end = mm.find(b'\n', pos)
+                if end == -1:
+                    end = size
+                # Check the first byte before slicing; only lines that open
+                # with whitespace need a strip to tell if they are blank
+                if end > pos and (mm[pos] not in _WHITESPACE or mm[pos:end].strip()):
+                    yield pos, mm[pos:end]
+                pos = end + 1
+    finally:
+        os.close(fd)
+
+
+def select_offsets(path: str, start: int = 0, stop: Optional[int] = None,
+                   byte_range: Optional[Tuple[int, int]] = None) -> List[int]:
+    """
+    Return the byte offsets of records [start, stop) without parsing them.
+
+    When byte_range is given, record indices are counted within that chunk.
+    """
+    lines = iter_jsonl_mmap(path, *byte_range) if byte_range else iter_jsonl_mmap(path)
+    return [offset for offset, _ in islice(lines, start, stop)]
+
+
+def _build_offset_index(path: str) -> Dict[str, int]:
+    """Scan the dataset once and map every task_id to its line's byte offset."""
+    return {_loads(line)['task_id']: offset for offset, line in iter_jsonl_mmap(path)}
+
+
+@lru_cache(maxsize=8)
+def _load_offset_index(path: str, mtime_ns: int, size: int) -> Dict[str, int]:
+    """Load the pickled offset index next to the dataset, rebuilding it if stale."""
+    index_path = path + ".idx"
+    stamp = (mtime_ns, size)
+    try:
+        with open(index_path, 'rb') as f:
+            saved_stamp, index = pickle.load(f)
+        if saved_stamp == stamp:
+            return index
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    index = _build_offset_index(path)
+    try:
+        with open(index_path, 'wb') as f:
+            pickle.dump((stamp, index), f)
+    except OSError:
+        pass  # Read-only dataset directory: keep the in-memory index only
+    return index
+
+
+def get_offset_index(path: str) -> Dict[str, int]:
+    """Return the {task_id: byte_offset} index for a dataset file."""
+    st = os.stat(path)
+    return _load_offset_index(path, st.st_mtime_ns, st.st_size)
+
+
+def map_jsonl(path: str) -> mmap.mmap:
+    """Map a JSONL file read-only; the mapping stays valid after the fd is closed."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+
+
+def read_record(mm: mmap.mmap, offset: int) -> Dict:
+    """Parse the single JSONL record starting at `offset` in a mapped file."""
+    end = mm.find(b'\n', offset)
+    return _loads(mm[offset:end if end != -1 else len(mm)])
+
+
+def load_task(path: str, task_id: str) -> Optional[Dict]:
+    """Load a single record by task_id, parsing only that line."""
+    offset = get_offset_index(path).get(task_id)
+    if offset is None:
+        return None
+    with map_jsonl(path) as mm:
+        return read_record(mm, offset)
+
+
+def dumps_line(obj: Any) -> bytes:
+    """Serialize obj as a single newline-terminated JSONL record."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj) + "\n").encode()
+
+
+def write_json(path: str, obj: Any, default: Optional[Callable[[Any], Any]] = None):
+    """
+    Write obj as indented JSON, using orjson when it is available.
+
+    `default` converts values JSON cannot represent, as in json.dump. The data
+    goes to a temporary file that is then renamed over `path`, so readers never
+    observe a half-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    if orjson is not None:
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(obj, default=default,
+                                 option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(tmp_path, 'w') as f:
+            json.dump(obj, f, indent=2, default=default)
+    os.replace(tmp_path, path)
@@ -1,5 +1,5 @@
-from typing import Dict, List, Any, Optional, Literal
-from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Literal, Sequence, Tuple
+from dataclasses import dataclass, field, fields
 from enum import Enum
 
 class FixStrategy(Enum):
@@ -7,6 +7,9 @@ class FixStrategy(Enum):
     LLM_GUIDED = "llm_guided" 
     HYBRID = "hybrid"
 
+# Default strategy order; immutable, so every state can share it
+_DEFAULT_STRATEGY_SEQUENCE = (FixStrategy.RULE_BASED, FixStrategy.LLM_GUIDED, FixStrategy.HYBRID)
+
 class BugType(Enum):
     OPERATOR_MISUSE = "operator_misuse"
     MISSING_LOGIC = "missing_logic"
@@ -15,7 +18,7 @@ class BugType(Enum):
     EXCESS_LOGIC = "excess_logic"
     UNKNOWN = "unknown"
 
-@dataclass
+@dataclass(slots=True)
 class TestResult:
     passed: bool
     log: str
@@ -23,7 +26,7 @@ class TestResult:
     candidate_file: str
     errors: List[str] = field(default_factory=list)
     
-@dataclass 
+@dataclass(slots=True)
 class Attempt:
     attempt_num: int
     candidate_code: str
@@ -33,7 +36,7 @@ class Attempt:
     confidence: float
     rule_based_fix: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class CodeAnalysis:
     function_name: str
     parameters: List[str]
@@ -43,7 +46,7 @@ class CodeAnalysis:
     patterns_detected: List[str]
     confidence: float
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     # Core task data
     task_id: str
@@ -65,11 +68,7 @@ class AgentState:
     
     # Strategy state
     current_strategy: FixStrategy = FixStrategy.RULE_BASED
-    strategy_sequence: List[FixStrategy] = field(default_factory=lambda: [
-        FixStrategy.RULE_BASED, 
-        FixStrategy.LLM_GUIDED, 
-        FixStrategy.HYBRID
-    ])
+    strategy_sequence: Sequence[FixStrategy] = _DEFAULT_STRATEGY_SEQUENCE
     
     # Output state
     task_dir: str = ""
@@ -89,17 +88,7 @@ class AgentState:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for LangGraph compatibility."""
-        result = {}
-        for key, value in self.__dict__.items():
-            if isinstance(value, (Enum, FixStrategy, BugType)):
-                result[key] = value.value
-            elif hasattr(value, '__dict__'):  # dataclass instances
-                result[key] = value.__dict__ if value else None
-            elif isinstance(value, list) and value and hasattr(value[0], '__dict__'):
-                result[key] = [item.__dict__ for item in value]
-            else:
-                result[key] = value
-        return result
+        return {name: _to_plain(getattr(self, name)) for name in _FIELD_NAMES[AgentState]}
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AgentState':
@@ -112,4 +101,21 @@ class AgentState:
             tests=data.get('tests', ''),
             task_prompt=data.get('task_prompt', ''),
             task_dir=data.get('task_dir', '')
-        )
\ No newline at end of file
+        )
+
+# Field names per state dataclass, computed once instead of introspected per call
+_FIELD_NAMES: Dict[type, Tuple[str, ...]] = {
+    cls: tuple(f.name for f in fields(cls))
+    for cls in (TestResult, Attempt, CodeAnalysis, AgentState)
+}
+
+def _to_plain(value: Any) -> Any:
+    """Recursively convert enums and state dataclasses to plain values."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    names = _FIELD_NAMES.get(type(value))
+    if names is not None:
+        return {name: _to_plain(getattr(value, name)) for name in names}
+    return value
@@ -1,78 +1,199 @@
 import re
 import ast
+import functools
+import threading
 from typing import Dict, List, Tuple, Optional
 from core.state import AgentState, CodeAnalysis, BugType
 
-class CodeAnalyzer:
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Known bug patterns per bug type: (regex, description)
+BUG_PATTERNS = {
+    BugType.OPERATOR_MISUSE: [
+        (r'def\s+\w*mul\w*.*?return.*?\+', "Multiplication function using addition"),
+        (r'def\s+\w*add\w*.*?return.*?-', "Addition function using subtraction"),
+        (r'def\s+\w*sub\w*.*?return.*?\+', "Subtraction function using addition"),
+        (r'def\s+\w*div\w*.*?return.*?\*', "Division function using multiplication"),
+        (r'if\s+.*?==\s+.*?:\s*return\s+True.*?return\s+False', "Logical comparison reversal"),
+    ],
+    BugType.MISSING_LOGIC: [
+        (r'def\s+.*?:\s*pass', "Function with only pass statement"),
+        (r'for\s+.*?:\s*$', "Empty for loop"),
+        (r'if\s+.*?:\s*$', "Empty if statement"),
+        (r'def\s+(?!.*return).*?:', "Function missing return statement"),
+    ],
+    BugType.VARIABLE_MISUSE: [
+        (r'(\w+)\s*=.*?\1\s*[+\-*/]\s*\w+', "Variable used before definition"),
+        (r'return\s+\w+\s*/\s*\w+', "Division by variable instead of length"),
+        (r'sum\s*\(\s*(\w+)\s*\)\s*/\s*\1', "Dividing by list instead of length"),
+    ],
+    BugType.VALUE_MISUSE: [
+        (r'prod_value\s*=\s*0', "Product initialized to 0 instead of 1"),
+        (r'=\s*1\.0\s*\+', "Adding 1.0 to decimal part"),
+        (r'<\s*0.*?return\s+True', "Wrong comparison for below zero"),
+    ],
+    BugType.EXCESS_LOGIC: [
+        (r'return\s+.*?\+\s*1\.0', "Adding unnecessary 1.0"),
+        (r'\w+\s*\+\s*\w+\s*\+\s*\w+', "Excessive operations"),
+    ]
+}
+
+# Compiled once at import, flattened in declaration order
+_COMPILED_BUG_PATTERNS = tuple(
+    (bug_type, re.compile(pattern, re.MULTILINE | re.DOTALL), description)
+    for bug_type, patterns in BUG_PATTERNS.items()
+    for pattern, description in patterns
+)
+
+def _build_hyperscan_db():
+    """
+    Compile every bug pattern Hyperscan supports into one block-mode database.
+    
+    Returns (db, ids) where ids holds the indices into _COMPILED_BUG_PATTERNS
+    that the database covers. Patterns using back-references or lookaheads
+    are rejected by Hyperscan and keep going through re.
+    """
+    if hyperscan is None:
+        return None, frozenset()
+    flags = (hyperscan.HS_FLAG_DOTALL | hyperscan.HS_FLAG_MULTILINE |
+             hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP)
+    supported = []
+    for i, (_, pattern, _) in enumerate(_COMPILED_BUG_PATTERNS):
+        try:
+            hyperscan.Database().compile(expressions=[pattern.pattern.encode()], flags=[flags])
+        except hyperscan.error:
+            continue
+        supported.append(i)
+    if not supported:
+        return None, frozenset()
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[_COMPILED_BUG_PATTERNS[i][1].pattern.encode() for i in supported],
+        ids=supported,
+        flags=[flags] * len(supported)
+    )
+    return db, frozenset(supported)
+
+_HS_DB, _HS_IDS = _build_hyperscan_db()
+_hs_local = threading.local()  # Hyperscan scratch space must not be shared between threads
+
+def _hyperscan_matches(code: str) -> set:
+    """Scan code once and return the ids of all matching Hyperscan patterns."""
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_HS_DB)
+    matches = set()
+    _HS_DB.scan(code.encode(), match_event_handler=lambda id, start, end, flags, ctx: ctx.add(id),
+                context=matches, scratch=scratch)
+    return matches
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_code(code: str) -> Tuple[Optional[ast.Module], str]:
+    """
+    Parse code once per distinct snippet. Returns (tree, "") or
+    (None, syntax error message); the trees are only read, never mutated.
+    """
+    try:
+        return ast.parse(code), ""
+    except SyntaxError as e:
+        return None, str(e)
+
+
+_generic_visit = ast.NodeVisitor.generic_visit
+
+
+class _FuncStatsVisitor(ast.NodeVisitor):
+    """
+    Collect name, args, return count and cyclomatic complexity of every
+    function in a single traversal. Counts of nested functions are folded
+    into their enclosing function, as a full walk of the outer body would.
+    """
+    
     def __init__(self):
-        self.bug_patterns = {
-            BugType.OPERATOR_MISUSE: [
-                (r'def\s+\w*mul\w*.*?return.*?\+', "Multiplication function using addition"),
-                (r'def\s+\w*add\w*.*?return.*?-', "Addition function using subtraction"),
-                (r'def\s+\w*sub\w*.*?return.*?\+', "Subtraction function using addition"),
-                (r'def\s+\w*div\w*.*?return.*?\*', "Division function using multiplication"),
-                (r'if\s+.*?==\s+.*?:\s*return\s+True.*?return\s+False', "Logical comparison reversal"),
-            ],
-            BugType.MISSING_LOGIC: [
-                (r'def\s+.*?:\s*pass', "Function with only pass statement"),
-                (r'for\s+.*?:\s*$', "Empty for loop"),
-                (r'if\s+.*?:\s*$', "Empty if statement"),
-                (r'def\s+(?!.*return).*?:', "Function missing return statement"),
-            ],
-            BugType.VARIABLE_MISUSE: [
-                (r'(\w+)\s*=.*?\1\s*[+\-*/]\s*\w+', "Variable used before definition"),
-                (r'return\s+\w+\s*/\s*\w+', "Division by variable instead of length"),
-                (r'sum\s*\(\s*(\w+)\s*\)\s*/\s*\1', "Dividing by list instead of length"),
-            ],
-            BugType.VALUE_MISUSE: [
-                (r'prod_value\s*=\s*0', "Product initialized to 0 instead of 1"),
-                (r'=\s*1\.0\s*\+', "Adding 1.0 to decimal part"),
-                (r'<\s*0.*?return\s+True', "Wrong comparison for below zero"),
-            ],
-            BugType.EXCESS_LOGIC: [
-                (r'return\s+.*?\+\s*1\.0', "Adding unnecessary 1.0"),
-                (r'\w+\s*\+\s*\w+\s*\+\s*\w+', "Excessive operations"),
-            ]
+        self.functions = []  # (depth, info) in source order
+        self._stack = []
+        self._depth = 0
+    
+    def visit(self, node):
+        # Dispatch on the node type through a dict instead of NodeVisitor's
+        # per-node 'visit_' + name string building and getattr
+        self._depth += 1
+        self._HANDLERS.get(node.__class__, _generic_visit)(self, node)
+        self._depth -= 1
+    
+    def visit_FunctionDef(self, node):
+        info = {
+            'name': node.name,
+            'args': [arg.arg for arg in node.args.args],
+            'returns': 0,
+            'complexity': 1  # Base complexity
         }
+        self.functions.append((self._depth, info))
+        self._stack.append(info)
+        self.generic_visit(node)
+        self._stack.pop()
+        if self._stack:
+            parent = self._stack[-1]
+            parent['returns'] += info['returns']
+            parent['complexity'] += info['complexity'] - 1
+    
+    def visit_Return(self, node):
+        if self._stack:
+            self._stack[-1]['returns'] += 1
+        self.generic_visit(node)
+    
+    def _visit_branch(self, node):
+        if self._stack:
+            self._stack[-1]['complexity'] += 1
+        self.generic_visit(node)
+    
+    def visit_BoolOp(self, node):
+        if self._stack:
+            self._stack[-1]['complexity'] += len(node.values) - 1
+        self.generic_visit(node)
+    
+    _HANDLERS = {
+        ast.FunctionDef: visit_FunctionDef,
+        ast.Return: visit_Return,
+        ast.If: _visit_branch,
+        ast.For: _visit_branch,
+        ast.While: _visit_branch,
+        ast.Try: _visit_branch,
+        ast.BoolOp: visit_BoolOp,
+    }
+    
+    def ordered_functions(self) -> List[Dict]:
+        """Functions in breadth-first order, matching what ast.walk yields."""
+        return [info for _, info in sorted(self.functions, key=lambda item: item[0])]
+
+class CodeAnalyzer:
+    bug_patterns = BUG_PATTERNS
     
     def analyze_code_structure(self, code: str) -> Dict:
         """Analyze the basic structure of the code."""
-        try:
-            tree = ast.parse(code)
-            functions = []
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    func_info = {
-                        'name': node.name,
-                        'args': [arg.arg for arg in node.args.args],
-                        'returns': len([n for n in ast.walk(node) if isinstance(n, ast.Return)]),
-                        'complexity': self._calculate_complexity(node)
-                    }
-                    functions.append(func_info)
-            
-            return {
-                'functions': functions,
-                'total_lines': len(code.split('\n')),
-                'has_syntax_error': False
-            }
-        except SyntaxError as e:
+        # Count newlines instead of materializing the list of lines
+        total_lines = code.count('\n') + 1
+        tree, syntax_error = _parse_code(code)
+        if tree is None:
             return {
                 'functions': [],
-                'total_lines': len(code.split('\n')),
+                'total_lines': total_lines,
                 'has_syntax_error': True,
-                'syntax_error': str(e)
+                'syntax_error': syntax_error
             }
-    
-    def _calculate_complexity(self, node: ast.FunctionDef) -> int:
-        """Calculate cyclomatic complexity of a function."""
-        complexity = 1  # Base complexity
-        for child in ast.walk(node):
-            if isinstance(child, (ast.If, ast.For, ast.While, ast.Try)):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-        return complexity
+        
+        visitor = _FuncStatsVisitor()
+        visitor.visit(tree)
+        
+        return {
+            'functions': visitor.ordered_functions(),
+            'total_lines': total_lines,
+            'has_syntax_error': False
+        }
     
     def detect_bug_patterns(self, code: str) -> Tuple[BugType, List[str], float]:
         """Detect specific bug patterns in the code."""
@@ -80,12 +201,13 @@ class CodeAnalyzer:
         confidence_scores = []
         suspected_type = BugType.UNKNOWN
         
-        for bug_type, patterns in self.bug_patterns.items():
-            for pattern, description in patterns:
-                if re.search(pattern, code, re.MULTILINE | re.DOTALL):
-                    detected_patterns.append(description)
-                    confidence_scores.append(0.8)  # High confidence for pattern matches
-                    suspected_type = bug_type
+        # One Hyperscan pass covers most patterns; the rest fall back to re
+        hs_matches = _hyperscan_matches(code) if _HS_DB is not None else ()
+        for i, (bug_type, pattern, description) in enumerate(_COMPILED_BUG_PATTERNS):
+            if (i in hs_matches) if i in _HS_IDS else pattern.search(code):
+                detected_patterns.append(description)
+                confidence_scores.append(0.8)  # High confidence for pattern matches
+                suspected_type = bug_type
         
         # Additional heuristic analysis
         if 'mul' in code and '+' in code and suspected_type == BugType.UNKNOWN:
@@ -99,24 +221,35 @@ class CodeAnalyzer:
     def analyze_test_requirements(self, tests: str) -> List[str]:
         """Extract requirements from test cases."""
         requirements = []
+        examples = []
         
-        # Extract assert statements
-        assert_patterns = re.findall(r'assert\s+(.+)', tests)
-        for pattern in assert_patterns:
-            requirements.append(f"Must satisfy: {pattern}")
-        
-        # Extract expected behaviors from docstring examples
-        docstring_examples = re.findall(r'>>>\s*(.+?)\n\s*(.+)', tests)
-        for call, expected in docstring_examples:
-            requirements.append(f"Example: {call} should return {expected}")
+        # One left-to-right pass over the lines collects assert statements
+        # and docstring examples (a ">>>" line followed by its expected output)
+        lines = tests.splitlines()
+        i = 0
+        while i < len(lines):
+            stripped = lines[i].lstrip()
+            if stripped[:7] in ('assert ', 'assert\t'):
+                requirements.append(f"Must satisfy: {stripped[7:].strip()}")
+            elif stripped.startswith('>>>') and i + 1 < len(lines):
+                call = stripped[3:].strip()
+                expected = lines[i + 1].strip()
+                if call and expected:
+                    examples.append(f"Example: {call} should return {expected}")
+                    i += 1  # The expected line is consumed with its example
+            i += 1
         
+        requirements.extend(examples)
         return requirements
 
+# CodeAnalyzer is stateless; share one instance across calls
+_get_analyzer = functools.lru_cache(maxsize=1)(CodeAnalyzer)
+
 def analysis_node(state: Dict) -> Dict:
     """
     Comprehensive code analysis node that identifies bugs and requirements.
     """
-    analyzer = CodeAnalyzer()
+    analyzer = _get_analyzer()
     
     # Extract basic information
     buggy_code = state.get('buggy_code', '')
@@ -148,13 +281,12 @@ def analysis_node(state: Dict) -> Dict:
         'confidence': confidence
     }
     
-    # Update state
-    updated_state = {
-        **state,
+    # Update state in place; the workflow passes one dict through every node
+    state.update({
         'code_analysis': code_analysis,
         'test_requirements': test_requirements,
         'error_patterns': patterns,
         'analysis_complete': True
-    }
+    })
     
-    return updated_state
\ No newline at end of file
+    return state
\ No newline at end of file
@@ -27,10 +27,12 @@ def decision_node(state: Dict) -> Dict:
     
     # Check if test passed
     if test_result.get("passed", False):
-        return {**state, "done": True, "next_step": "end", "final_status": "solved"}
+        state.update(done=True, next_step="end", final_status="solved")
+        return state
     
     # Check if we should continue
     if current_attempt < max_attempts - 1:
-        return {**state, "done": False, "next_step": "retry", "current_attempt": current_attempt + 1}
+        state.update(done=False, next_step="retry", current_attempt=current_attempt + 1)
     else:
-        return {**state, "done": True, "next_step": "end", "final_status": "unsolved"}
\ No newline at end of file
+        state.update(done=True, next_step="end", final_status="unsolved")
+    return state
\ No newline at end of file
@@ -1,48 +1,337 @@
+import os
 import re
+import ast
+import copy
+import contextlib
+import functools
+import importlib.util
+import threading
 from typing import Dict, List, Tuple, Optional
+from config import Config
 from core.state import FixStrategy
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, pipeline
+from transformers import (AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig,
+                          StoppingCriteria, StoppingCriteriaList)
+
+# Response parsing regexes, compiled once at import
+# Any info string on the opening fence (python, py, python3, ...) is skipped
+_FENCED_BLOCK_RE = re.compile(r'(?P<tagged>CODE:\s*)?```(?:[^\s`]*[ \t]*\n)?\s*(?P<block>.*?)```',
+                              re.DOTALL | re.IGNORECASE)
+# Bare function definitions, only searched outside fenced blocks; a bare
+# function runs until the next unindented line, so blank lines in its body are kept
+_TAGGED_FUNC_RE = re.compile(r'CODE:\s*(def\s+.*?)(?=\n\s*\n|\Z)', re.DOTALL | re.IGNORECASE)
+_BARE_FUNC_RE = re.compile(r'def\s+(?!check)\w+.*?(?=\n(?![ \t\r\n])|\Z)', re.DOTALL)
+# Section headers of the response format; a section runs up to the next
+# header that can follow it (or the end of the response)
+_SECTION_RE = re.compile(r'(ANALYSIS|STRATEGY|CODE):\s*', re.IGNORECASE)
+_REASONING_SECTIONS = (('ANALYSIS', ('STRATEGY', 'CODE')), ('STRATEGY', ('ANALYSIS', 'CODE')))
+
+# Fixed instructions at the start of every prompt; the model's KV cache for it
+# is computed once and reused (see LLMCodeGenerator._build_prefix_cache)
+SYSTEM_PROMPT = """You are an expert Python debugger. Your task is to fix buggy code by analyzing the error patterns and applying precise corrections.
+
+CRITICAL INSTRUCTIONS:
+- You must ONLY generate the function implementation, NOT the test code
+- Generate COMPLETE, WORKING Python function code
+- Do NOT copy or generate test cases - only fix the buggy function
+- Extract the function name from the task description or tests
+
+ANALYSIS APPROACH:
+1. Understand the intended functionality from tests and task description
+2. Identify the specific bug based on error patterns and code analysis
+3. Apply the minimal necessary fix while preserving code structure
+4. Ensure the fix addresses root cause, not just symptoms
+
+RESPONSE FORMAT:
+Provide your response in exactly this format:
+
+ANALYSIS: [Your detailed analysis of the bug]
+STRATEGY: [Your fix strategy]
+CODE:
+```python
+[ONLY the corrected function - complete implementation]
+```
+
+CRITICAL RULES:
+- Generate ONLY the function implementation, never test code
+- Always provide complete, executable Python function code
+- Never use placeholders like [your code here]
+- Preserve or infer the correct function signature
+- Test your logic mentally before writing code
+- The function must solve the actual problem, not just run tests"""
+PROMPT_PREFIX = SYSTEM_PROMPT + "\n\n"
+_ATTEMPT_SEPARATOR = "-" * 40 + "\n"
+
+DEFAULT_MODEL_ID = os.environ.get("LLM_MODEL_ID", "bigcode/starcoder2-3b")
+# Weight precision: "bf16" (unquantized), "nf4" (4-bit NormalFloat), "int8"
+# for comparison runs, or "auto": bf16 when the GPU has room for it, else nf4.
+# Set in config.py (Config.MODEL_PRECISION) or overridden with LLM_PRECISION
+DEFAULT_PRECISION = os.environ.get("LLM_PRECISION", Config.MODEL_PRECISION)
+PRECISIONS = ("auto", "bf16", "nf4", "int8")
+# bf16 weights of a 3B model take ~6 GB; below this much VRAM fall back to nf4
+BF16_MIN_VRAM_BYTES = 8 * 1024 ** 3
+
+# Sampling settings shared by every model.generate call. Temperature alone:
+# at 0.3 the top-k/top-p tails hold next to no probability mass, so their
+# per-step sort and cumulative sum are skipped (top_k=0 and top_p=1.0 also
+# override any filters from the model's generation config). Sampling is kept
+# so that several candidates of one prompt can differ.
+_SAMPLING_KWARGS = dict(do_sample=True, temperature=0.3, top_k=0, top_p=1.0)
+
+# Token budgets: a first attempt rarely needs the full one; retries carry
+# longer prompts and get more room. Generation also stops at the end of the
+# code block (see _CodeFenceStop), so unused budget costs nothing.
+FIRST_ATTEMPT_MAX_NEW_TOKENS = 256
+RETRY_MAX_NEW_TOKENS = 512
+
+def _max_new_tokens(attempts: List[Dict]) -> int:
+    return RETRY_MAX_NEW_TOKENS if attempts else FIRST_ATTEMPT_MAX_NEW_TOKENS
+
+class _CodeFenceStop(StoppingCriteria):
+    """
+    Stop each sequence once its fenced code block is closed: the response
+    format ends with the code, so whatever follows the second ``` is dropped
+    by extraction anyway. Only a row whose newest token contains a backtick
+    is decoded in full.
+    """
+    
+    def __init__(self, tokenizer, prompt_length: int):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        last_pieces = self.tokenizer.batch_decode(input_ids[:, -1:])
+        done = [
+            '`' in piece and
+            self.tokenizer.decode(row[self.prompt_length:], skip_special_tokens=True).count('```') >= 2
+            for piece, row in zip(last_pieces, input_ids)
+        ]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+def _resolve_precision(precision: str) -> str:
+    """
+    Pick the concrete precision for "auto". At batch size 1 a small model
+    decodes fastest unquantized: bitsandbytes dequantization costs more than
+    the bandwidth it saves, so quantize only when VRAM is short.
+    """
+    if precision != "auto":
+        return precision
+    if torch.cuda.is_available() and torch.cuda.get_device_properties(0).total_memory >= BF16_MIN_VRAM_BYTES:
+        return "bf16"
+    return "nf4"
+
+def _quantization_config(precision: str) -> Optional[BitsAndBytesConfig]:
+    """bitsandbytes config for the given weight precision (None for bf16)."""
+    if precision == "bf16":
+        return None
+    if precision == "int8":
+        return BitsAndBytesConfig(load_in_8bit=True)
+    # Decode is bound by streaming weights; 4-bit halves the bytes read per token
+    return BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16,
+        bnb_4bit_use_double_quant=True
+    )
+
+def _attn_implementation() -> str:
+    """FlashAttention-2 when it is installed and a GPU is present, otherwise PyTorch SDPA."""
+    if torch.cuda.is_available() and importlib.util.find_spec("flash_attn") is not None:
+        return "flash_attention_2"
+    return "sdpa"
+
+def _function_name(text: str) -> Optional[str]:
+    """Name of the first "def <name>(" in text, found with str.find instead of a regex."""
+    start = text.find('def ')
+    if start == -1:
+        return None
+    head = text[start + 4:start + 132].lstrip(' \t')
+    name = head[:head.find('(')].rstrip() if '(' in head else head
+    return name if name.isidentifier() else None
+
+def _swap_returned_additions(code: str) -> str:
+    """
+    Turn the + operators of each returned BinOp chain into *. Only the
+    top-level chain is touched (a + b + c), never subscripts, call arguments
+    or lambdas, and the operator is replaced in place so comments and layout
+    survive. Unparsable code is returned as is.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    # AST columns are UTF-8 byte offsets, so edit the encoded source
+    source = code.encode('utf-8')
+    line_starts = [0]
+    for line in source.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    operators = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Return):
+            continue
+        expr = node.value
+        while isinstance(expr, ast.BinOp):
+            if isinstance(expr.op, ast.Add):
+                start = line_starts[expr.left.end_lineno - 1] + expr.left.end_col_offset
+                end = line_starts[expr.right.lineno - 1] + expr.right.col_offset
+                # The gap holds the operator plus whitespace, closing parens and comments
+                pos = start
+                while pos < end:
+                    if source[pos:pos + 1] == b'#':
+                        pos = source.find(b'\n', pos, end)
+                        if pos == -1:
+                            break
+                    elif source[pos:pos + 1] == b'+':
+                        operators.append(pos)
+                        break
+                    pos += 1
+            expr = expr.left
+    if not operators:
+        return code
+    edited = bytearray(source)
+    for pos in operators:
+        edited[pos:pos + 1] = b'*'
+    return edited.decode('utf-8')
+
+def _looks_like_fix(code: str) -> bool:
+    """True for a function implementation, False for empty output or test code."""
+    # The O(1) prefix test rejects a check() harness before any full scan;
+    # the remaining needles are plain substring searches, which CPython's
+    # fastsearch handles faster than any single multi-pattern pass
+    return (not code.startswith('def check') and
+            'def ' in code and
+            'assert' not in code and  # Avoid test code
+            'check(' not in code)  # Avoid test functions
 
 class LLMCodeGenerator:
-    def __init__(self, model_id: str = "bigcode/starcoder2-3b"):
+    def __init__(self, model_id: str = DEFAULT_MODEL_ID, precision: str = DEFAULT_PRECISION):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown model precision {precision!r}; expected one of {PRECISIONS}")
         self.model_id = model_id
+        self.precision = _resolve_precision(precision)
         self.tokenizer = None
         self.model = None
-        self.pipe = None
         self.device = "auto"  # Use auto for GPU detection
+        self._prefix_ids = None
+        self._prefix_cache = None
         self._initialize_model()
     
     def _initialize_model(self):
         """Initialize the model with GPU optimization."""
         try:
-            # Use 8-bit quantization for efficiency
-            bnb_config = BitsAndBytesConfig(load_in_8bit=True)
+            bnb_config = _quantization_config(self.precision)
             
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
             self.model = AutoModelForCausalLM.from_pretrained(
                 self.model_id,
                 device_map="auto",
-                quantization_config=bnb_config
-            )
-            
-            # Create pipeline for easier generation
-            self.pipe = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer
+                quantization_config=bnb_config,
+                # Fused attention kernels; FlashAttention-2 needs half-precision activations
+                attn_implementation=_attn_implementation(),
+                torch_dtype=torch.bfloat16
             )
+            self.model.eval()
             
             # Add padding token if missing
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
+            # Decoder-only models must be left-padded for batched generation
+            self.tokenizer.padding_side = "left"
+            
+            if not self._compile_model():
+                self._build_prefix_cache()
                 
         except Exception as e:
             print(f"Failed to load model {self.model_id}: {e}")
             print("Falling back to mock LLM for testing")
             self.model = None
             self.tokenizer = None
-            self.pipe = None
+    
+    def _compile_model(self):
+        """
+        Compile the forward pass with CUDA graphs ("reduce-overhead") so each
+        decode step replays a captured graph instead of launching kernels one
+        by one. A static KV cache keeps shapes fixed enough to capture. Falls
+        back to the eager model on CPU or if compilation fails.
+        
+        Returns True if the compiled model is in use.
+        """
+        if not torch.cuda.is_available():
+            return False
+        
+        eager_forward = self.model.forward
+        try:
+            self.model.forward = torch.compile(eager_forward, mode="reduce-overhead", dynamic=False)
+            self.model.generation_config.cache_implementation = "static"
+            
+            # Warm up once so graph capture happens at load time, not on the first task
+            inputs = self.tokenizer("def f():", return_tensors="pt").to(self.model.device)
+            with torch.inference_mode():
+                self.model.generate(**inputs, max_new_tokens=4, pad_token_id=self.tokenizer.eos_token_id)
+            return True
+        except Exception as e:
+            print(f"torch.compile failed, using the eager model: {e}")
+            self.model.forward = eager_forward
+            self.model.generation_config.cache_implementation = None
+            return False
+    
+    def _build_prefix_cache(self):
+        """
+        Run the fixed prompt prefix through the model once and keep its KV
+        cache, so each generate_code call only prefills the task-specific part.
+        Only used with the eager model: the compiled one needs a static cache,
+        which cannot be seeded from a precomputed prefix.
+        """
+        try:
+            self._prefix_ids = self.tokenizer(PROMPT_PREFIX, return_tensors="pt").input_ids.to(self.model.device)
+            with torch.inference_mode():
+                self._prefix_cache = self.model(self._prefix_ids, use_cache=True).past_key_values
+        except Exception as e:
+            print(f"Prompt prefix caching disabled: {e}")
+            self._prefix_ids = None
+            self._prefix_cache = None
+    
+    def _generation_kwargs(self, prompt_length: int, max_new_tokens: int) -> Dict:
+        """model.generate arguments for prompts padded to prompt_length tokens."""
+        return dict(
+            _SAMPLING_KWARGS,
+            max_new_tokens=max_new_tokens,
+            pad_token_id=self.tokenizer.eos_token_id,
+            stopping_criteria=StoppingCriteriaList([_CodeFenceStop(self.tokenizer, prompt_length)])
+        )
+    
+    def _generate_with_prefix_cache(self, prompt: str, max_new_tokens: int = RETRY_MAX_NEW_TOKENS) -> str:
+        """Generate a response reusing the cached KV state of PROMPT_PREFIX."""
+        suffix_ids = self.tokenizer(
+            prompt[len(PROMPT_PREFIX):], return_tensors="pt", add_special_tokens=False
+        ).input_ids.to(self.model.device)
+        input_ids = torch.cat([self._prefix_ids, suffix_ids], dim=-1)
+        
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=copy.deepcopy(self._prefix_cache),  # generate() extends the cache in place
+                **self._generation_kwargs(input_ids.shape[1], max_new_tokens)
+            )
+        return self.tokenizer.decode(output_ids[0, input_ids.shape[1]:], skip_special_tokens=True).strip()
+    
+    def _generate(self, prompts: List[str], max_new_tokens: int = RETRY_MAX_NEW_TOKENS,
+                  num_return_sequences: int = 1) -> List[str]:
+        """
+        Generate num_return_sequences responses per prompt with a single
+        model.generate call, decoding only the new tokens. Prompts are
+        left-padded, so every response starts at the same column of the output.
+        """
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                num_return_sequences=num_return_sequences,
+                **self._generation_kwargs(inputs.input_ids.shape[1], max_new_tokens)
+            )
+        new_ids = output_ids[:, inputs.input_ids.shape[1]:]
+        return [text.strip() for text in self.tokenizer.batch_decode(new_ids, skip_special_tokens=True)]
     
     def build_advanced_prompt(self, 
                             buggy_code: str, 
@@ -52,38 +341,6 @@ class LLMCodeGenerator:
                             task_prompt: str = "") -> str:
         """Build an advanced prompt with context and analysis."""
         
-        system_prompt = """You are an expert Python debugger. Your task is to fix buggy code by analyzing the error patterns and applying precise corrections.
-
-CRITICAL INSTRUCTIONS:
-- You must ONLY generate the function implementation, NOT the test code
-- Generate COMPLETE, WORKING Python function code
-- Do NOT copy or generate test cases - only fix the buggy function
-- Extract the function name from the task description or tests
-
-ANALYSIS APPROACH:
-1. Understand the intended functionality from tests and task description
-2. Identify the specific bug based on error patterns and code analysis
-3. Apply the minimal necessary fix while preserving code structure
-4. Ensure the fix addresses root cause, not just symptoms
-
-RESPONSE FORMAT:
-Provide your response in exactly this format:
-
-ANALYSIS: [Your detailed analysis of the bug]
-STRATEGY: [Your fix strategy]
-CODE:
-```python
-[ONLY the corrected function - complete implementation]
-```
-
-CRITICAL RULES:
-- Generate ONLY the function implementation, never test code
-- Always provide complete, executable Python function code
-- Never use placeholders like [your code here]
-- Preserve or infer the correct function signature
-- Test your logic mentally before writing code
-- The function must solve the actual problem, not just run tests"""
-
         # Build context from analysis
         analysis_context = ""
         if analysis:
@@ -100,39 +357,38 @@ PATTERNS FOUND: {'; '.join(patterns)}
         # Build failure context from previous attempts with detailed feedback
         failure_context = ""
         if attempts:
-            failure_context = "\nPREVIOUS FAILED ATTEMPTS WITH ANALYSIS:\n"
+            # Collect the pieces and join once instead of growing a string with +=
+            parts = ["\nPREVIOUS FAILED ATTEMPTS WITH ANALYSIS:\n"]
             for i, attempt in enumerate(attempts[-3:]):  # Show last 3 attempts
                 test_result = attempt.get('test_result', {})
                 if not test_result.get('passed', False):
-                    failure_context += f"\n--- FAILED ATTEMPT {attempt.get('attempt_num', i+1)} ---\n"
-                    failure_context += f"Strategy: {attempt.get('strategy_used', 'unknown')}\n"
-                    failure_context += f"Generated Code:\n{attempt.get('candidate_code', 'No code')[:300]}\n"
-                    failure_context += f"Error: {test_result.get('log', 'No error log')[:400]}\n"
+                    parts.append(
+                        f"\n--- FAILED ATTEMPT {attempt.get('attempt_num', i+1)} ---\n"
+                        f"Strategy: {attempt.get('strategy_used', 'unknown')}\n"
+                        f"Generated Code:\n{attempt.get('candidate_code', 'No code')[:300]}\n"
+                        f"Error: {test_result.get('log', 'No error log')[:400]}\n"
+                    )
                     
                     # Add specific error analysis
                     error_log = test_result.get('log', '')
                     if 'SyntaxError' in error_log:
-                        failure_context += "❌ SYNTAX ERROR: Fix syntax issues (colons, parentheses, indentation)\n"
+                        parts.append("❌ SYNTAX ERROR: Fix syntax issues (colons, parentheses, indentation)\n")
                     elif 'AssertionError' in error_log:
-                        failure_context += "❌ LOGIC ERROR: Algorithm is wrong - review the logic\n"
+                        parts.append("❌ LOGIC ERROR: Algorithm is wrong - review the logic\n")
                     elif 'NameError' in error_log:
-                        failure_context += "❌ NAME ERROR: Check variable/function names\n"
+                        parts.append("❌ NAME ERROR: Check variable/function names\n")
                     elif 'TypeError' in error_log:
-                        failure_context += "❌ TYPE ERROR: Check data types and parameters\n"
+                        parts.append("❌ TYPE ERROR: Check data types and parameters\n")
                     
-                    failure_context += "-" * 40 + "\n"
+                    parts.append(_ATTEMPT_SEPARATOR)
+            failure_context = "".join(parts)
 
         # Extract function name from task_prompt
-        function_name = "unknown_function"
-        if task_prompt:
-            func_match = re.search(r'def\s+(\w+)', task_prompt)
-            if func_match:
-                function_name = func_match.group(1)
+        function_name = _function_name(task_prompt) or "unknown_function"
         
         # Add feedback-specific guidance
         feedback_guidance = ""
         if attempts:
-            feedback_guidance = "\n🔍 LEARN FROM FAILURES: "
             common_errors = []
             for attempt in attempts:
                 error = attempt.get('test_result', {}).get('log', '')
@@ -143,10 +399,12 @@ PATTERNS FOUND: {'; '.join(patterns)}
                 elif 'distance = elem - elem2' in attempt.get('candidate_code', ''):
                     common_errors.append("Use absolute value: abs(elem - elem2)")
             
-            if common_errors:
-                feedback_guidance += "; ".join(set(common_errors))
+            # dict.fromkeys dedupes in first-seen order, so the prompt is deterministic
+            feedback_guidance = "\n🔍 LEARN FROM FAILURES: " + "; ".join(dict.fromkeys(common_errors))
         
-        user_prompt = f"""
+        # The fixed prefix is part of the same f-string, so the whole prompt is
+        # built in one step instead of being copied again by a concatenation
+        return f"""{PROMPT_PREFIX}
 TASK: Fix the buggy function to pass all tests.
 
 FUNCTION TO IMPLEMENT: {function_name}
@@ -174,75 +432,53 @@ TESTS THAT MUST PASS:
 5. Test your logic mentally before writing code
 
 Generate the corrected function now:"""
-
-        return system_prompt + "\n\n" + user_prompt
     
     def extract_code_from_response(self, response: str) -> str:
         """Extract Python code from LLM response."""
-        # Try multiple patterns to extract code
-        patterns = [
-            r'CODE:\s*```python\s*(.*?)```',
-            r'```python\s*(.*?)```',
-            r'```\s*(def\s+.*?)```',
-            r'CODE:\s*(def\s+.*?)(?=\n\s*\n|\Z)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response, re.DOTALL | re.IGNORECASE)
-            if match:
-                code = match.group(1).strip()
-                # Validate this is actual function code, not test code
-                if (code and 
-                    'def ' in code and 
-                    'assert' not in code and  # Avoid test code
-                    'check(' not in code and  # Avoid test functions
-                    not code.startswith('def check') and  # Avoid test functions
-                    len([line for line in code.split('\n') if line.strip().startswith('assert')]) == 0):
+        # Fenced blocks first: a block after "CODE:" wins, else the first valid block
+        best_code = ""
+        fenced_spans = []
+        for match in _FENCED_BLOCK_RE.finditer(response):
+            fenced_spans.append(match.span())
+            code = match.group('block').strip()
+            if _looks_like_fix(code):
+                if match.group('tagged'):
                     return code
+                best_code = best_code or code
+        if best_code:
+            return best_code
         
-        # Fallback: extract function definition that's not a test
-        func_matches = re.findall(r'(def\s+(?!check)\w+.*?)(?=\ndef\s|\n\n|\Z)', response, re.DOTALL)
-        for func in func_matches:
-            func_clean = func.strip()
-            # Make sure it's not test code
-            if ('assert' not in func_clean and 
-                'check(' not in func_clean and
-                not func_clean.startswith('def check')):
-                return func_clean
-        
-        # Last resort: try to find any function that looks like implementation
-        lines = response.split('\n')
-        function_lines = []
-        in_function = False
-        
-        for line in lines:
-            if line.strip().startswith('def ') and 'check' not in line.lower():
-                in_function = True
-                function_lines = [line]
-            elif in_function:
-                if line.strip() and not line.startswith(' ') and not line.startswith('\t'):
-                    # End of function
-                    break
-                function_lines.append(line)
-        
-        if function_lines:
-            candidate = '\n'.join(function_lines).strip()
-            if 'assert' not in candidate:
-                return candidate
+        # No usable block: look for bare functions in the text around the
+        # fences only, so a "def name" in the prose cannot swallow a block
+        if fenced_spans:
+            pieces, start = [], 0
+            for block_start, block_end in fenced_spans:
+                pieces.append(response[start:block_start])
+                start = block_end
+            pieces.append(response[start:])
+            response = "\n\n".join(pieces)
         
+        match = _TAGGED_FUNC_RE.search(response)
+        if match and _looks_like_fix(match.group(1).strip()):
+            return match.group(1).strip()
+        for match in _BARE_FUNC_RE.finditer(response):
+            code = match.group().strip()
+            if _looks_like_fix(code):
+                return code
         return ""
     
     def extract_reasoning(self, response: str) -> str:
         """Extract reasoning from LLM response."""
         reasoning_parts = []
         
-        analysis_match = re.search(r'ANALYSIS:\s*(.*?)(?=STRATEGY:|CODE:|$)', response, re.DOTALL | re.IGNORECASE)
-        if analysis_match:
-            reasoning_parts.append(f"ANALYSIS: {analysis_match.group(1).strip()}")
-        
-        strategy_match = re.search(r'STRATEGY:\s*(.*?)(?=ANALYSIS:|CODE:|$)', response, re.DOTALL | re.IGNORECASE)
-        if strategy_match:
-            reasoning_parts.append(f"STRATEGY: {strategy_match.group(1).strip()}")
+        # Locate every header in one scan, then slice the sections out
+        headers = [(m.group(1).upper(), m.start(), m.end()) for m in _SECTION_RE.finditer(response)]
+        for name, stops in _REASONING_SECTIONS:
+            for i, (header, _, content_start) in enumerate(headers):
+                if header == name:
+                    end = next((start for other, start, _ in headers[i + 1:] if other in stops), len(response))
+                    reasoning_parts.append(f"{name}: {response[content_start:end].strip()}")
+                    break
         
         return "\n".join(reasoning_parts) if reasoning_parts else "No reasoning extracted"
     
@@ -254,41 +490,101 @@ Generate the corrected function now:"""
                      task_prompt: str = "") -> Tuple[str, str, float]:
         """Generate corrected code using LLM."""
         
-        if self.pipe is None:
+        if self.model is None:
             # Mock LLM response for testing
             return self._mock_generation(buggy_code, analysis)
         
         prompt = self.build_advanced_prompt(buggy_code, tests, analysis, attempts, task_prompt)
         
         try:
-            # Use pipeline for generation
-            outputs = self.pipe(
-                prompt,
-                max_new_tokens=512,
-                do_sample=True,
-                temperature=0.3,
-                top_k=50,
-                top_p=0.95,
-                pad_token_id=self.pipe.tokenizer.eos_token_id
-            )
-            
-            # Extract the generated response (remove the input prompt)
-            full_response = outputs[0]["generated_text"]
-            response = full_response[len(prompt):].strip()
-            
-            # Extract code and reasoning
-            code = self.extract_code_from_response(response)
-            reasoning = self.extract_reasoning(response)
+            max_new_tokens = _max_new_tokens(attempts)
+            if self._prefix_cache is not None:
+                response = self._generate_with_prefix_cache(prompt, max_new_tokens)
+            else:
+                response = self._generate([prompt], max_new_tokens)[0]
             
-            # Calculate confidence based on code quality
-            confidence = self._calculate_confidence(code, buggy_code)
-            
-            return code, reasoning, confidence
+            return self._parse_response(response, buggy_code)
             
         except Exception as e:
             print(f"LLM generation failed: {e}")
             return self._mock_generation(buggy_code, analysis)
     
+    def generate_candidates(self,
+                            buggy_code: str,
+                            tests: str,
+                            analysis: Dict,
+                            attempts: List[Dict],
+                            task_prompt: str = "",
+                            n: int = 4) -> List[Tuple[str, str, float]]:
+        """
+        Sample n fixes for one task from a single model.generate call.
+        
+        Duplicate codes are dropped (the first occurrence is kept), so fewer
+        than n candidates may come back; there is always at least one.
+        """
+        if self.model is None or n <= 1:
+            return [self.generate_code(buggy_code, tests, analysis, attempts, task_prompt)]
+        
+        prompt = self.build_advanced_prompt(buggy_code, tests, analysis, attempts, task_prompt)
+        
+        try:
+            responses = self._generate([prompt], _max_new_tokens(attempts), num_return_sequences=n)
+        except Exception as e:
+            print(f"Sampling {n} candidates failed, generating one: {e}")
+            return [self.generate_code(buggy_code, tests, analysis, attempts, task_prompt)]
+        
+        candidates = {}
+        for response in responses:
+            code, reasoning, confidence = self._parse_response(response, buggy_code)
+            candidates.setdefault(code, (code, reasoning, confidence))
+        return list(candidates.values())
+    
+    def generate_batch(self, requests: List[Dict], batch_size: int = 8) -> List[Tuple[str, str, float]]:
+        """
+        Generate fixes for several tasks, batch_size prompts per model.generate call.
+        
+        Each request holds buggy_code, tests, analysis, task_prompt and
+        optionally the task's previous attempts. Results come back in request order.
+        """
+        if self.model is None:
+            return [self._mock_generation(r['buggy_code'], r['analysis']) for r in requests]
+        
+        prompts = [
+            self.build_advanced_prompt(r['buggy_code'], r['tests'], r['analysis'],
+                                       r.get('attempts', []), r['task_prompt'])
+            for r in requests
+        ]
+        
+        try:
+            responses = []
+            for start in range(0, len(prompts), batch_size):
+                chunk = requests[start:start + batch_size]
+                max_new_tokens = max(_max_new_tokens(r.get('attempts', [])) for r in chunk)
+                responses.extend(self._generate(prompts[start:start + batch_size], max_new_tokens))
+        except Exception as e:
+            print(f"Batched LLM generation failed, generating one by one: {e}")
+            return [
+                self.generate_code(r['buggy_code'], r['tests'], r['analysis'],
+                                   r.get('attempts', []), r['task_prompt'])
+                for r in requests
+            ]
+        
+        return [
+            self._parse_response(response, r['buggy_code'])
+            for response, r in zip(responses, requests)
+        ]
+    
+    def _parse_response(self, response: str, buggy_code: str) -> Tuple[str, str, float]:
+        """Extract code, reasoning and a confidence score from a model response."""
+        # Extract code and reasoning
+        code = self.extract_code_from_response(response)
+        reasoning = self.extract_reasoning(response)
+        
+        # Calculate confidence based on code quality
+        confidence = self._calculate_confidence(code, buggy_code)
+        
+        return code, reasoning, confidence
+    
     def _mock_generation(self, buggy_code: str, analysis: Dict) -> Tuple[str, str, float]:
         """Mock LLM generation for testing when model fails."""
         # Simple mock that tries to fix common operator issues
@@ -296,7 +592,7 @@ Generate the corrected function now:"""
         reasoning = "Mock LLM: Attempting basic operator fix"
         
         if 'mul' in buggy_code and '+' in buggy_code:
-            mock_code = re.sub(r'return\s+(\w+)\s*\+\s*(\w+)', r'return \1 * \2', buggy_code)
+            mock_code = _swap_returned_additions(buggy_code)
             reasoning = "Mock LLM: Replaced + with * in multiplication function"
         
         return mock_code, reasoning, 0.5
@@ -313,28 +609,143 @@ Generate the corrected function now:"""
         if '[' in generated_code and 'code' in generated_code.lower():
             return 0.2  # Likely contains placeholders
         
-        # Check for common good patterns
-        score = 0.5
+        # Check for common good patterns; the code is known to differ from
+        # the original here, which earns the final 0.2 without comparing again
+        score = 0.7
         if 'return ' in generated_code:
             score += 0.2
-        if len(generated_code.split('\n')) > 1:
+        if '\n' in generated_code:
             score += 0.1
-        if generated_code != original_code:
-            score += 0.2
         
         return min(score, 1.0)
 
+# Loading the model takes seconds; build one generator per model id and reuse it.
+# Generators hold no per-call state, so sharing them between calls is safe.
+# Always pass model id and precision positionally so equal settings share one entry.
+get_generator = functools.lru_cache(maxsize=4)(LLMCodeGenerator)
+
+class BatchingGenerator:
+    """
+    Thread-safe front for an LLMCodeGenerator that merges concurrent
+    generate_code calls into generate_batch calls.
+    
+    Task threads register with task() while they run. Queued requests are
+    flushed as one batch when batch_size of them are waiting, or when every
+    registered task is waiting, so a straggler never waits for company that
+    is not coming. Only one batch runs on the model at a time.
+    """
+    
+    def __init__(self, generator: LLMCodeGenerator, batch_size: int):
+        self.generator = generator
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        self._pending = []  # [request, result] slots in arrival order
+        self._active = 0
+        self._flushing = False
+    
+    @contextlib.contextmanager
+    def task(self):
+        """Mark the calling thread as a running task for the flush rule."""
+        with self._cond:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+    
+    def _should_flush(self) -> bool:
+        waiting = len(self._pending)
+        return waiting > 0 and not self._flushing and (
+            waiting >= self.batch_size or waiting >= self._active
+        )
+    
+    def generate_code(self, buggy_code: str, tests: str, analysis: Dict,
+                      attempts: List[Dict], task_prompt: str = "") -> Tuple[str, str, float]:
+        """Queue one request and block until its batch has been generated."""
+        slot = [{
+            'buggy_code': buggy_code,
+            'tests': tests,
+            'analysis': analysis,
+            'attempts': attempts,
+            'task_prompt': task_prompt
+        }, None]
+        with self._cond:
+            self._pending.append(slot)
+            self._cond.notify_all()
+            while slot[1] is None:
+                if not self._should_flush():
+                    self._cond.wait()
+                    continue
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                self._flushing = True
+                self._cond.release()
+                results = []
+                try:
+                    results = self.generator.generate_batch([s[0] for s in batch], self.batch_size)
+                except Exception as e:
+                    results = [e] * len(batch)
+                finally:
+                    # Fill every slot even if generation was interrupted
+                    # (KeyboardInterrupt, SystemExit), or the other threads
+                    # in the batch would wait forever
+                    self._cond.acquire()
+                    self._flushing = False
+                    missing = RuntimeError("Batch generation did not return a result")
+                    for i, s in enumerate(batch):
+                        s[1] = results[i] if i < len(results) else missing
+                    self._cond.notify_all()
+        if isinstance(slot[1], Exception):
+            raise slot[1]
+        return slot[1]
+    
+    def generate_candidates(self, buggy_code: str, tests: str, analysis: Dict,
+                            attempts: List[Dict], task_prompt: str = "",
+                            n: int = 4) -> List[Tuple[str, str, float]]:
+        """Sample n candidates for one task, taking the model between two batches."""
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            self._flushing = True
+        try:
+            return self.generator.generate_candidates(buggy_code, tests, analysis, attempts, task_prompt, n)
+        finally:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+
+_LLM_STRATEGIES = frozenset({FixStrategy.LLM_GUIDED.value, FixStrategy.HYBRID.value})
+
+# Generator used by llm_generator_node instead of the cached one, see use_generator()
+_generator_override = None
+
+@contextlib.contextmanager
+def use_generator(generator):
+    """Route every llm_generator_node call through `generator` (e.g. a BatchingGenerator)."""
+    global _generator_override
+    previous, _generator_override = _generator_override, generator
+    try:
+        yield generator
+    finally:
+        _generator_override = previous
+
 def llm_generator_node(state: Dict) -> Dict:
     """
     LLM-guided code generator node.
+    
+    The model is chosen by the optional state keys 'model_id' and
+    'model_precision' ("auto" by default, see PRECISIONS).
+    With 'num_candidates' > 1, that many fixes are sampled in one call and
+    listed in 'candidate_codes', most confident first, for the test node.
     """
     current_strategy = state.get('current_strategy', '')
     
     # Only proceed if LLM or hybrid strategy is selected
-    if current_strategy not in [FixStrategy.LLM_GUIDED.value, FixStrategy.HYBRID.value]:
-        return {**state, 'code_generated': True}
-    
-    generator = LLMCodeGenerator()
+    if current_strategy not in _LLM_STRATEGIES:
+        state['code_generated'] = True
+        return state
     
     # Extract required information
     buggy_code = state.get('buggy_code', '')
@@ -343,11 +754,22 @@ def llm_generator_node(state: Dict) -> Dict:
     attempts = state.get('attempts', [])
     task_prompt = state.get('task_prompt', '')
     
-    # Generate code using LLM
-    generated_code, reasoning, confidence = generator.generate_code(
-        buggy_code, tests, analysis, attempts, task_prompt
+    generator = _generator_override or get_generator(
+        state.get('model_id', DEFAULT_MODEL_ID),
+        state.get('model_precision', DEFAULT_PRECISION)
     )
     
+    # Generate code using LLM
+    num_candidates = state.get('num_candidates', 1)
+    if num_candidates > 1:
+        candidates = generator.generate_candidates(
+            buggy_code, tests, analysis, attempts, task_prompt, num_candidates
+        )
+        candidates.sort(key=lambda c: c[2], reverse=True)
+    else:
+        candidates = [generator.generate_code(buggy_code, tests, analysis, attempts, task_prompt)]
+    generated_code, reasoning, confidence = candidates[0]
+    
     # For hybrid strategy, combine with rule-based if available
     if current_strategy == FixStrategy.HYBRID.value:
         rule_based_code = state.get('candidate_code', '')
@@ -356,14 +778,14 @@ def llm_generator_node(state: Dict) -> Dict:
             reasoning += f"\nHybrid approach: Refining rule-based fix with LLM guidance"
             # In a real implementation, you might want to pass the rule-based code to LLM for refinement
     
-    # Update state
-    updated_state = {
-        **state,
+    # Update state in place; the workflow passes one dict through every node
+    state.update({
         'candidate_code': generated_code,
+        'candidate_codes': [code for code, _, _ in candidates if code],
         'llm_reasoning': reasoning,
         'confidence_score': max(confidence, state.get('confidence_score', 0.0)),
         'llm_calls': state.get('llm_calls', 0) + 1,
         'code_generated': True
-    }
+    })
     
-    return updated_state
\ No newline at end of file
+    return state
\ No newline at end of file
@@ -1,28 +1,83 @@
 import subprocess
 import os
-from typing import Dict
+import json
+import threading
+from typing import Dict, Optional
+
+TIMEOUT_SECONDS = 5
+_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Persistent interpreters that run candidates, so each call skips Python
+# start-up. A caller checks one out for the duration of a run, which lets
+# concurrent callers each use their own; a worker that times out or crashes
+# is discarded and replaced on demand
+_idle_workers = []
+_workers_lock = threading.Lock()
+
+def _checkout_worker() -> subprocess.Popen:
+    with _workers_lock:
+        while _idle_workers:
+            worker = _idle_workers.pop()
+            if worker.poll() is None:
+                return worker
+    return subprocess.Popen(
+        ["python", "-u", _WORKER_PATH],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+
+def run_in_worker(code: str, tests: str, candidate_file: str,
+                  timeout: float = TIMEOUT_SECONDS, cwd: Optional[str] = None) -> Dict:
+    """
+    Run code + tests in a persistent worker interpreter, killing it on timeout.
+    Returns {"passed", "stdout", "stderr"}, plus "timed_out" when the run failed
+    without a reply.
+    """
+    worker = _checkout_worker()
+    frame = json.dumps({"code": code, "tests": tests, "filename": candidate_file, "cwd": cwd})
+    timed_out = threading.Event()
+    
+    def kill():
+        timed_out.set()
+        worker.kill()
+    
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        worker.stdin.write(frame + "\n")
+        worker.stdin.flush()
+        reply = worker.stdout.readline()
+    except OSError:
+        reply = ""
+    finally:
+        timer.cancel()
+    if reply and not timed_out.is_set():
+        with _workers_lock:
+            _idle_workers.append(worker)
+        return json.loads(reply)
+    if reply:
+        # The timer fired just after the reply arrived: the result stands,
+        # but the worker has been killed and must not go back in the pool
+        worker.kill()
+        worker.wait()
+        return json.loads(reply)
+    
+    # The worker was killed by the timer or died running the candidate
+    worker.kill()
+    worker.wait()
+    log = "Execution timed out" if timed_out.is_set() else "Sandbox worker exited unexpectedly"
+    return {"passed": False, "stdout": "", "stderr": log, "timed_out": timed_out.is_set()}
 
 def run_in_sandbox(code: str, tests: str, attempt: int, output_dir: str) -> Dict:
     """
-    Run candidate code + tests in a subprocess sandbox.
+    Run candidate code + tests in a sandbox interpreter.
     Returns dict with pass/fail and error logs.
     """
     os.makedirs(output_dir, exist_ok=True)
     candidate_file = os.path.join(output_dir, f"cand_{attempt}.py")
     with open(candidate_file, "w") as f:
         f.write(code + "\n\n" + tests + "\n")
-    try:
-        result = subprocess.run(
-            ["python", candidate_file],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=5
-        )
-        passed = result.returncode == 0
-        log = result.stdout + result.stderr
-    except subprocess.TimeoutExpired:
-        passed = False
-        log = "Execution timed out"
+    result = run_in_worker(code, tests, candidate_file)
     # Always pass the full error log to the LLM for better reasoning
-    return {"passed": passed, "log": log, "candidate_file": candidate_file}
\ No newline at end of file
+    return {"passed": result["passed"], "log": result["stdout"] + result["stderr"], "candidate_file": candidate_file}
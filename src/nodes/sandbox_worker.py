@@ -0,0 +1,53 @@
+"""
+Long-lived interpreter behind sandbox_runner.run_in_sandbox.
+
+Reads one JSON frame per line from stdin ({"code", "tests", "filename"} and
+an optional "cwd"), executes code + tests in a fresh namespace and answers
+with one JSON line {"passed", "stdout", "stderr"}. The process's own stdin/stdout are moved to private file
+descriptors first, so candidates that print or read input cannot corrupt the
+frame stream; fd 2 goes to devnull too, so raw writes to it cannot leak past
+the captured stderr.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import traceback
+
+
+def run_frame(frame: dict) -> dict:
+    """Execute one candidate the way `python candidate.py` would."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    namespace = {'__name__': '__main__', '__file__': frame['filename']}
+    source = frame['code'] + "\n\n" + frame['tests'] + "\n"
+    sys.stdin = io.StringIO()
+    if frame.get('cwd'):
+        os.chdir(frame['cwd'])
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exec(compile(source, frame['filename'], 'exec'), namespace)
+        passed = True
+    except SystemExit as e:
+        passed = e.code in (None, 0)
+    except BaseException as e:
+        # Drop this function's frame so the traceback reads like `python file.py`
+        passed = False
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next, file=stderr)
+    return {'passed': passed, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+def main():
+    requests = os.fdopen(os.dup(0), 'r')
+    replies = os.fdopen(os.dup(1), 'w')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    for line in requests:
+        replies.write(json.dumps(run_frame(json.loads(line))) + "\n")
+        replies.flush()
+
+
+if __name__ == "__main__":
+    main()
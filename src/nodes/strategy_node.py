@@ -1,41 +1,44 @@
 from typing import Dict, List
 from core.state import FixStrategy, BugType
 
+# Expected success rate of each strategy per bug type; a read-only table shared
+# by every selector instead of being rebuilt for each strategy_node call
+STRATEGY_EFFECTIVENESS = {
+    BugType.OPERATOR_MISUSE: {
+        FixStrategy.RULE_BASED: 0.9,
+        FixStrategy.LLM_GUIDED: 0.7,
+        FixStrategy.HYBRID: 0.95
+    },
+    BugType.MISSING_LOGIC: {
+        FixStrategy.RULE_BASED: 0.3,
+        FixStrategy.LLM_GUIDED: 0.8,
+        FixStrategy.HYBRID: 0.85
+    },
+    BugType.VARIABLE_MISUSE: {
+        FixStrategy.RULE_BASED: 0.4,
+        FixStrategy.LLM_GUIDED: 0.9,
+        FixStrategy.HYBRID: 0.9
+    },
+    BugType.VALUE_MISUSE: {
+        FixStrategy.RULE_BASED: 0.8,
+        FixStrategy.LLM_GUIDED: 0.7,
+        FixStrategy.HYBRID: 0.9
+    },
+    BugType.EXCESS_LOGIC: {
+        FixStrategy.RULE_BASED: 0.6,
+        FixStrategy.LLM_GUIDED: 0.8,
+        FixStrategy.HYBRID: 0.85
+    },
+    BugType.UNKNOWN: {
+        FixStrategy.RULE_BASED: 0.2,
+        FixStrategy.LLM_GUIDED: 0.7,
+        FixStrategy.HYBRID: 0.6
+    }
+}
+
+
 class StrategySelector:
-    def __init__(self):
-        # Define strategy effectiveness for different bug types
-        self.strategy_effectiveness = {
-            BugType.OPERATOR_MISUSE: {
-                FixStrategy.RULE_BASED: 0.9,
-                FixStrategy.LLM_GUIDED: 0.7,
-                FixStrategy.HYBRID: 0.95
-            },
-            BugType.MISSING_LOGIC: {
-                FixStrategy.RULE_BASED: 0.3,
-                FixStrategy.LLM_GUIDED: 0.8,
-                FixStrategy.HYBRID: 0.85
-            },
-            BugType.VARIABLE_MISUSE: {
-                FixStrategy.RULE_BASED: 0.4,
-                FixStrategy.LLM_GUIDED: 0.9,
-                FixStrategy.HYBRID: 0.9
-            },
-            BugType.VALUE_MISUSE: {
-                FixStrategy.RULE_BASED: 0.8,
-                FixStrategy.LLM_GUIDED: 0.7,
-                FixStrategy.HYBRID: 0.9
-            },
-            BugType.EXCESS_LOGIC: {
-                FixStrategy.RULE_BASED: 0.6,
-                FixStrategy.LLM_GUIDED: 0.8,
-                FixStrategy.HYBRID: 0.85
-            },
-            BugType.UNKNOWN: {
-                FixStrategy.RULE_BASED: 0.2,
-                FixStrategy.LLM_GUIDED: 0.7,
-                FixStrategy.HYBRID: 0.6
-            }
-        }
+    strategy_effectiveness = STRATEGY_EFFECTIVENESS
     
     def select_strategy(self, 
                        suspected_bug_type: BugType, 
@@ -43,17 +46,16 @@ class StrategySelector:
                        previous_attempts: List[Dict],
                        complexity_score: int) -> FixStrategy:
         """Select the best strategy based on analysis and history."""
+        used_strategies = {attempt.get('strategy_used') for attempt in previous_attempts}
         
         # If we have high confidence and it's a simple bug, try rule-based first
         if confidence > 0.8 and suspected_bug_type in [BugType.OPERATOR_MISUSE, BugType.VALUE_MISUSE]:
-            if not any(attempt.get('strategy_used') == FixStrategy.RULE_BASED.value 
-                      for attempt in previous_attempts):
+            if FixStrategy.RULE_BASED.value not in used_strategies:
                 return FixStrategy.RULE_BASED
         
         # If rule-based failed or confidence is medium, try LLM
         if confidence > 0.5:
-            if not any(attempt.get('strategy_used') == FixStrategy.LLM_GUIDED.value 
-                      for attempt in previous_attempts):
+            if FixStrategy.LLM_GUIDED.value not in used_strategies:
                 return FixStrategy.LLM_GUIDED
         
         # For complex cases or when other strategies failed, use hybrid
@@ -67,23 +69,21 @@ class StrategySelector:
         if current_attempt == 0:
             return [FixStrategy.RULE_BASED, FixStrategy.LLM_GUIDED, FixStrategy.HYBRID]
         
-        # If rule-based worked well, prioritize it
-        rule_based_success = any(
-            attempt.get('strategy_used') == FixStrategy.RULE_BASED.value and 
-            attempt.get('test_result', {}).get('passed', False)
-            for attempt in previous_results
-        )
+        # One pass over the history for both signals
+        rule_based_success = False
+        llm_partial_success = False
+        for attempt in previous_results:
+            strategy = attempt.get('strategy_used')
+            if strategy == FixStrategy.RULE_BASED.value:
+                rule_based_success = rule_based_success or attempt.get('test_result', {}).get('passed', False)
+            elif strategy == FixStrategy.LLM_GUIDED.value:
+                llm_partial_success = llm_partial_success or len(attempt.get('test_result', {}).get('errors', [])) < 3
         
+        # If rule-based worked well, prioritize it
         if rule_based_success:
             return [FixStrategy.RULE_BASED, FixStrategy.HYBRID]
         
         # If LLM showed promise, focus on LLM strategies
-        llm_partial_success = any(
-            attempt.get('strategy_used') == FixStrategy.LLM_GUIDED.value and
-            len(attempt.get('test_result', {}).get('errors', [])) < 3
-            for attempt in previous_results
-        )
-        
         if llm_partial_success:
             return [FixStrategy.LLM_GUIDED, FixStrategy.HYBRID]
         
@@ -114,12 +114,11 @@ def strategy_node(state: Dict) -> Dict:
     # Adapt strategy sequence for future attempts
     strategy_sequence = selector.adapt_strategy_sequence(current_attempt, attempts)
     
-    # Update state
-    updated_state = {
-        **state,
+    # Update state in place; the workflow passes one dict through every node
+    state.update({
         'current_strategy': selected_strategy.value,
         'strategy_sequence': [s.value for s in strategy_sequence],
         'strategy_selected': True
-    }
+    })
     
-    return updated_state
\ No newline at end of file
+    return state
\ No newline at end of file
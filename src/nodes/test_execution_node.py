@@ -2,61 +2,210 @@ import subprocess
 import os
 import time
 import ast
+import builtins
+import hashlib
+import threading
 import traceback
-from typing import Dict, List, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+from .sandbox_runner import run_in_worker
+
+# Longest test output kept in memory; the full log is written next to the candidate
+MAX_LOG_CHARS = 1000
+
+# Results of previous runs keyed by a digest of candidate + tests, so a
+# candidate the generator repeats is not sent through the subprocess again
+RESULT_CACHE_SIZE = 4096
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# Runs pytest-style test files: stop at the first failure, skip the header and
+# the cache directory, and print native tracebacks so _analyze_errors still
+# sees the exception names
+PYTEST_COMMAND = ["python", "-m", "pytest", "-x", "-q", "--no-header", "--tb=native",
+                  "-p", "no:cacheprovider", "--disable-warnings"]
+
+# Output directories already created, so later attempts skip the makedirs syscalls
+_created_dirs = set()
+
+# Candidates are tested on one pool shared by every task thread, so concurrent
+# test subprocesses stay within the cores left over for the agent itself.
+# Threads suffice: each one only waits on its subprocess.
+_TEST_POOL = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 1) - 2),
+                                thread_name_prefix="candidate-tests")
+
+
+def write_file(path: str, text: str):
+    """One-shot write of a small file without going through a buffered text wrapper."""
+    data = text.encode("utf-8", "replace")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def truncate_log(log: str) -> str:
+    """Keep the head and the tail of a long log; the traceback ends up at the tail."""
+    if len(log) <= MAX_LOG_CHARS:
+        return log
+    half = MAX_LOG_CHARS // 2
+    return f"{log[:half]}\n... [{len(log) - MAX_LOG_CHARS} chars truncated] ...\n{log[-half:]}"
+
+def _cached_result(key: bytes):
+    with _result_cache_lock:
+        result = _result_cache.get(key)
+        if result is not None:
+            _result_cache.move_to_end(key)
+        return result
+
+
+def _store_result(key: bytes, result: Tuple[bool, str, float, List[str]]):
+    if "execution_error" in result[3] or "timeout" in result[3]:
+        # Harness failures and timeouts (which depend on machine load) are
+        # not a property of the candidate, so a later attempt runs it again
+        return
+    with _result_cache_lock:
+        _result_cache[key] = result
+        if len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+# Names a module can load without binding them itself
+_PREDEFINED_NAMES = frozenset(dir(builtins)) | {'__file__', '__builtins__', '__annotations__'}
+# Loading any of these means names may be bound at runtime or the script may
+# exit successfully early, so a missing name no longer guarantees a failure
+_DYNAMIC_NAMES = frozenset({'globals', 'locals', 'vars', 'exec', 'eval', 'setattr',
+                            'exit', 'quit', 'SystemExit', 'sys', 'os', 'builtins'})
+
+
+_NESTED_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+                  ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _module_scope(node: ast.AST):
+    """Yield `node` and its descendants, without entering nested scopes' bodies."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _NESTED_SCOPES):
+                yield child
+            else:
+                stack.append(child)
+
+
+def _unbound_top_level_names(tree: ast.Module) -> List[str]:
+    """
+    Names loaded by top-level expression and assert statements (e.g. the
+    tests' `check(entry_point)`) that nothing at module level binds, i.e.
+    statements certain to raise NameError.
+    """
+    loaded = set()
+    bound = set(_PREDEFINED_NAMES)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            loaded.add(node.id)
+        elif isinstance(node, ast.alias) and node.name == '*':
+            return []
+        elif isinstance(node, ast.Global):
+            bound.update(node.names)
+        elif isinstance(node, ast.NamedExpr):
+            bound.add(node.target.id)
+    if loaded & _DYNAMIC_NAMES:
+        return []
+    
+    for node in _module_scope(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.alias):
+            bound.add((node.asname or node.name).split('.')[0])
+        elif isinstance(node, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            bound.add(node.rest)
+    
+    missing = set()
+    for stmt in tree.body:
+        if isinstance(stmt, (ast.Expr, ast.Assert)):
+            missing.update(node.id for node in _module_scope(stmt)
+                           if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
+                           and node.id not in bound)
+    return sorted(missing)
+
+
 class TestExecutor:
-    def __init__(self):
+    def __init__(self, reuse_interpreter: bool = False):
         self.timeout = 10  # seconds
+        # Run candidates in a persistent sandbox worker instead of a fresh
+        # `python` per candidate: no interpreter start-up, but modules the
+        # candidates import stay loaded between runs
+        self.reuse_interpreter = reuse_interpreter
     
-    def create_test_file(self, code: str, tests: str, output_dir: str, attempt: int) -> str:
+    def create_test_file(self, code: str, tests: str, output_dir: str, attempt: int,
+                         variant: int = None) -> str:
         """Create a test file with the candidate code and tests."""
-        os.makedirs(output_dir, exist_ok=True)
-        test_file = os.path.join(output_dir, f"candidate_{attempt}.py")
+        if output_dir not in _created_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+            _created_dirs.add(output_dir)
+        name = f"candidate_{attempt}" if variant is None else f"candidate_{attempt}_{variant}"
+        test_file = os.path.join(output_dir, f"{name}.py")
         
         # Combine code and tests
-        full_content = f"{code}\n\n{tests}"
-        
-        with open(test_file, "w", encoding="utf-8") as f:
-            f.write(full_content)
+        write_file(test_file, f"{code}\n\n{tests}")
         
         return test_file
     
-    def execute_tests(self, test_file: str) -> Tuple[bool, str, float, List[str]]:
-        """Execute the test file and return results."""
+    def execute_tests(self, test_file: str, code_content: Optional[str] = None) -> Tuple[bool, str, float, List[str]]:
+        """
+        Execute the test file and return results. Callers that just wrote the
+        file pass its content along so it is not read back.
+        """
         start_time = time.time()
         
         try:
             # First, check for syntax errors
-            with open(test_file, 'r', encoding='utf-8') as f:
-                code_content = f.read()
+            if code_content is None:
+                with open(test_file, 'r', encoding='utf-8') as f:
+                    code_content = f.read()
             
             try:
-                ast.parse(code_content)
+                tree = ast.parse(code_content)
             except SyntaxError as e:
                 execution_time = time.time() - start_time
                 return False, f"SyntaxError: {str(e)}", execution_time, ["syntax_error"]
             
+            # A name the tests call that the candidate never defines fails
+            # without needing an interpreter to find out
+            missing = _unbound_top_level_names(tree)
+            if missing:
+                execution_time = time.time() - start_time
+                return False, f"NameError: name '{missing[0]}' is not defined", execution_time, ["name_error"]
+            
+            # Test functions are never called by `python file.py`; pytest collects them
+            uses_pytest = any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                              and node.name.startswith('test_') for node in tree.body)
+            
             # Execute the file
-            result = subprocess.run(
-                ["python", test_file],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=self.timeout,
-                cwd=os.path.dirname(test_file)
-            )
+            returned_ok, stdout, stderr = self._run_file(test_file, code_content, uses_pytest)
             
             execution_time = time.time() - start_time
             
             # Analyze the output
-            stdout = result.stdout.strip()
-            stderr = result.stderr.strip()
+            stdout = stdout.strip()
+            stderr = stderr.strip()
             combined_output = (stdout + "\n" + stderr).strip()
             
             # Determine if tests passed
-            passed = result.returncode == 0 and not stderr
+            passed = returned_ok and not stderr
             
             # Extract error types
             error_types = self._analyze_errors(combined_output)
@@ -70,6 +219,26 @@ class TestExecutor:
             execution_time = time.time() - start_time
             return False, f"Execution error: {str(e)}", execution_time, ["execution_error"]
     
+    def _run_file(self, test_file: str, code_content: str,
+                  uses_pytest: bool = False) -> Tuple[bool, str, str]:
+        """Run the test file; returns (exited cleanly, stdout, stderr)."""
+        cwd = os.path.dirname(test_file)
+        if self.reuse_interpreter and not uses_pytest:
+            result = run_in_worker(code_content, "", test_file, self.timeout, cwd)
+            if result.get("timed_out"):
+                raise subprocess.TimeoutExpired(test_file, self.timeout)
+            return result["passed"], result["stdout"], result["stderr"]
+        
+        result = subprocess.run(
+            PYTEST_COMMAND + [test_file] if uses_pytest else ["python", test_file],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=self.timeout,
+            cwd=cwd
+        )
+        return result.returncode == 0, result.stdout, result.stderr
+    
     def _analyze_errors(self, output: str) -> List[str]:
         """Analyze error output to categorize error types."""
         error_types = []
@@ -129,6 +298,38 @@ class TestExecutor:
         
         return analysis
 
+def _run_candidate(executor: TestExecutor, code: str, tests: str, task_dir: str,
+                   attempt: int, variant: int = None) -> Dict:
+    """Write, run (or look up) and log one candidate; returns its test_result."""
+    test_file = executor.create_test_file(code, tests, task_dir, attempt, variant)
+    source = f"{code}\n\n{tests}"
+    key = hashlib.blake2b(source.encode("utf-8", "replace"), digest_size=16).digest()
+    result = _cached_result(key)
+    cache_hit = result is not None
+    if not cache_hit:
+        result = executor.execute_tests(test_file, source)
+        _store_result(key, result)
+    passed, output, exec_time, error_types = result
+    
+    # Analyze results
+    analysis = executor.analyze_test_results(passed, output, error_types)
+    
+    # Full output goes to disk; attempts only carry a bounded copy
+    log_file = os.path.splitext(test_file)[0] + ".log"
+    write_file(log_file, output)
+    
+    return {
+        'passed': passed,
+        'log': truncate_log(output),
+        'log_file': log_file,
+        # A cache hit ran nothing, so it reports no execution time
+        'execution_time': 0.0 if cache_hit else exec_time,
+        'errors': error_types,
+        'candidate_file': test_file,
+        'suggestions': analysis.get('suggestions', []),
+        'cache_hit': cache_hit
+    }
+
 def test_execution_node(state: Dict) -> Dict:
     """
     Test execution node that runs candidate code and provides detailed feedback.
@@ -138,45 +339,43 @@ def test_execution_node(state: Dict) -> Dict:
     tests = state.get('tests', '')
     task_dir = state.get('task_dir', '/tmp')
     current_attempt = state.get('current_attempt', 0)
+    candidate_codes = state.pop('candidate_codes', None) or []
     
     # Skip if no code generated
     if not candidate_code:
-        return {
-            **state,
-            'test_result': {
-                'passed': False,
-                'log': 'No candidate code generated',
-                'execution_time': 0.0,
-                'errors': ['no_code'],
-                'candidate_file': ''
-            },
-            'tests_executed': True
+        state['test_result'] = {
+            'passed': False,
+            'log': 'No candidate code generated',
+            'execution_time': 0.0,
+            'errors': ['no_code'],
+            'candidate_file': ''
         }
+        state['tests_executed'] = True
+        return state
     
-    executor = TestExecutor()
-    
-    # Create and execute test file
-    test_file = executor.create_test_file(candidate_code, tests, task_dir, current_attempt)
-    passed, output, exec_time, error_types = executor.execute_tests(test_file)
-    
-    # Analyze results
-    analysis = executor.analyze_test_results(passed, output, error_types)
+    executor = TestExecutor(reuse_interpreter=state.get('reuse_interpreter', False))
     
-    # Create test result
-    test_result = {
-        'passed': passed,
-        'log': output,
-        'execution_time': exec_time,
-        'errors': error_types,
-        'candidate_file': test_file,
-        'suggestions': analysis.get('suggestions', [])
-    }
+    # Several sampled candidates are tested side by side and the first one
+    # that passes (in confidence order) becomes the attempt's candidate
+    if len(candidate_codes) > 1:
+        results = list(_TEST_POOL.map(
+            lambda item: _run_candidate(executor, item[1], tests, task_dir, current_attempt, item[0]),
+            enumerate(candidate_codes)
+        ))
+        candidate_code, test_result = next(
+            ((code, result) for code, result in zip(candidate_codes, results) if result['passed']),
+            (candidate_codes[0], results[0])
+        )
+        state['candidate_code'] = candidate_code
+    else:
+        test_result = _TEST_POOL.submit(
+            _run_candidate, executor, candidate_code, tests, task_dir, current_attempt
+        ).result()
     
-    # Update state
-    updated_state = {
-        **state,
+    # Update state in place; the workflow passes one dict through every node
+    state.update({
         'test_result': test_result,
         'tests_executed': True
-    }
+    })
     
-    return updated_state
\ No newline at end of file
+    return state
\ No newline at end of file
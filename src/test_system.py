@@ -1,3 +1,4 @@
+import logging
 import sys
 import os
 
@@ -89,7 +90,7 @@ def test_model_loading():
         # This should either load the model or fall back to mock mode
         generator = LLMCodeGenerator()
         
-        if generator.pipe is not None:
+        if generator.model is not None:
             print("✓ Model loaded successfully")
         else:
             print("✓ Model loading failed gracefully (using mock mode)")
@@ -100,6 +101,40 @@ def test_model_loading():
         print(f"✗ Model loading test failed: {e}")
         return False
 
+def test_code_extraction():
+    """Test that code is extracted from typical model responses."""
+    print("Testing code extraction...")
+    
+    try:
+        from nodes.llm_generator_node import get_generator
+        
+        generator = get_generator()
+        fixed = "def add_numbers(a, b):\n    return a + b"
+        spaced = "def add_numbers(a, b):\n    total = a + b\n\n    return total"
+        cases = [
+            # A "def <name>" in the prose must not hide the fenced block
+            ("ANALYSIS: The bug is in def add_numbers where it uses subtraction.\n"
+             "STRATEGY: Replace - with +.\n"
+             f"CODE:\n```python\n{fixed}\n```", fixed),
+            (f"Here is the fix:\n```python\n{fixed}\n```\n```python\nassert add_numbers(1, 2) == 3\n```", fixed),
+            (f"CODE:\n```py\n{fixed}\n```", fixed),
+            (f"CODE:\n{fixed}\n\nThis now adds the numbers.", fixed),
+            # A blank line inside a bare function's body does not end it
+            (f"The corrected function:\n\n{spaced}\n\nIt now adds the numbers.", spaced),
+        ]
+        for response, expected in cases:
+            code = generator.extract_code_from_response(response)
+            if code != expected:
+                print(f"✗ Extracted {code!r} from {response!r}")
+                return False
+        
+        print("✓ Code extraction successful")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Code extraction test failed: {e}")
+        return False
+
 def main():
     """Run all tests."""
     print("=" * 50)
@@ -109,6 +144,7 @@ def main():
     tests = [
         ("Import Test", test_imports),
         ("Model Loading Test", test_model_loading),
+        ("Code Extraction Test", test_code_extraction),
         ("Simple Example Test", test_simple_example),
     ]
     
@@ -139,5 +175,6 @@ def main():
     return passed == total
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -1 +1 @@
-from .main_agent import StateGraph, CompiledGraph, CodeFixingAgent, run_fix_agent_for_example
\ No newline at end of file
+from .main_agent import CodeFixingAgent, run_fix_agent_for_example, run_many
\ No newline at end of file
@@ -2,11 +2,17 @@
 Main LangGraph workflow that orchestrates the code fixing agent.
 This implements a proper agentic system with multiple specialized nodes.
 """
+import asyncio
+import logging
 import os
+import re
 import time
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count, repeat
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List
 
 # Add the src directory to the path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,171 +20,89 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-
-from langgraph.graph import StateGraph, START, END
-
-class StateGraph:
-    def __init__(self, schema):
-        self.nodes = {}
-        self.edges = {}
-            
-    def add_node(self, name, func):
-        self.nodes[name] = func
-            
-    def add_edge(self, from_node, to_node):
-        if from_node not in self.edges:
-            self.edges[from_node] = []
-        self.edges[from_node].append(to_node)
-            
-    def add_conditional_edges(self, from_node, condition_func):
-        # Store conditional edges for manual handling
-        self.edges[f"{from_node}_conditional"] = condition_func
-            
-    def compile(self):
-        return CompiledGraph(self.nodes, self.edges)
-    
-class CompiledGraph:
-    def __init__(self, nodes, edges):
-        self.nodes = nodes
-        self.edges = edges
-            
-    def invoke(self, initial_state):
-        # Simple fallback execution without full LangGraph features
-        return self._simple_execution(initial_state)
-            
-    def _simple_execution(self, state):
-        # Execute nodes in a simple sequence for fallback
-        if "analysis" in self.nodes:
-            state = self.nodes["analysis"](state)
-        if "strategy" in self.nodes:
-            state = self.nodes["strategy"](state)
-            
-        strategy = state.get('current_strategy', 'rule_based')
-        if strategy == 'rule_based' and "rule_generation" in self.nodes:
-            state = self.nodes["rule_generation"](state)
-        elif "llm_generation" in self.nodes:
-            state = self.nodes["llm_generation"](state)
-                
-        if "test_execution" in self.nodes:
-            state = self.nodes["test_execution"](state)
-        if "decision" in self.nodes:
-            state = self.nodes["decision"](state)
-                
-        return state
-    
-START = "START"
-END = "END"
-
 # Import all the nodes
 from nodes.analysis_node import analysis_node
 from nodes.strategy_node import strategy_node
 from nodes.rule_based_generator import rule_based_generator_node
-from nodes.llm_generator_node import llm_generator_node
+from nodes.llm_generator_node import (llm_generator_node, get_generator, use_generator, BatchingGenerator,
+                                     DEFAULT_MODEL_ID, DEFAULT_PRECISION)
 from nodes.test_execution_node import test_execution_node
-from nodes.decision_node import decision_node
+from config import Config
+from core.dataset import select_offsets, map_jsonl, read_record, write_json, dumps_line
+
+log = logging.getLogger(__name__)
+
+# Run timestamp, formatted once per process; a counter keeps task directories
+# created within the same second apart
+_RUN_TS = time.strftime("%Y%m%d_%H%M%S")
+_next_id = count().__next__
+
+# Final exception line of a traceback, e.g. "TypeError: unsupported operand ..."
+_ERROR_SIGNATURE_RE = re.compile(r'^\w*(?:Error|Exception|Exit|Interrupt)\b.*$', re.MULTILINE)
+_MAX_SIGNATURE_CHARS = 200
+
+# Per-attempt fields, cleared after a failed attempt; everything else in the
+# state (analysis, attempts, feedback) carries over to the next one
+_ATTEMPT_SCRATCH = {
+    'candidate_code': '',
+    'reasoning': '',
+    'llm_reasoning': '',
+    'confidence_score': 0.0,
+    'rule_based_fix': False,
+    'code_generated': False,
+    'tests_executed': False,
+}
+
+# Feedback for the first error name found in a failed attempt's log, in priority order
+_ERROR_FEEDBACK = (
+    ('SyntaxError', "SYNTAX ERROR DETECTED: Check for missing colons, parentheses, or indentation issues."),
+    ('NameError', "NAME ERROR: Variable or function name not defined correctly."),
+    ('TypeError', "TYPE ERROR: Check function parameters and return types."),
+    ('AssertionError', "LOGIC ERROR: The function logic is incorrect - review the algorithm."),
+    ('IndentationError', "INDENTATION ERROR: Fix the code indentation."),
+)
+
+def _error_signature(log: str) -> str:
+    """The exception line a failure ended with, or the log's first line if there is none."""
+    signature = None
+    for signature in _ERROR_SIGNATURE_RE.finditer(log):
+        pass
+    line = signature.group() if signature else log.strip().partition('\n')[0]
+    return line[:_MAX_SIGNATURE_CHARS]
 
 class CodeFixingAgent:
     def __init__(self, base_dir: str = None):
-        # Import config here to avoid circular imports
-        from config import Config
-        
         if base_dir:
             self.base_dir = Config.setup_paths(base_dir)
         else:
             self.base_dir = Config.setup_paths()
-            
-        self.graph = self._build_graph()
-    
-    def _build_graph(self):
-        """Build the LangGraph state graph for the code fixing agent."""
-        
-        # Create the state graph
-        graph = StateGraph(dict)
-        
-        # Add all nodes
-        graph.add_node("analysis", analysis_node)
-        graph.add_node("strategy", strategy_node) 
-        graph.add_node("rule_generation", rule_based_generator_node)
-        graph.add_node("llm_generation", llm_generator_node)
-        graph.add_node("test_execution", test_execution_node)
-        graph.add_node("decision", decision_node)
-        
-        # Add conditional edges based on strategy
-        def route_after_strategy(state: Dict) -> str:
-            """Route to appropriate generator based on selected strategy."""
-            strategy = state.get('current_strategy', 'rule_based')
-            if strategy == 'rule_based':
-                return "rule_generation"
-            else:
-                return "llm_generation"
-        
-        def route_after_decision(state: Dict) -> str:
-            """Route based on decision node output."""
-            if state.get('done', False):
-                return END
-            else:
-                return "strategy"  # Try again with new strategy
-        
-        # Define the workflow edges
-        graph.add_edge(START, "analysis")
-        graph.add_edge("analysis", "strategy")
-        
-        # Conditional routing after strategy selection
-        graph.add_conditional_edges("strategy", route_after_strategy)
-        
-        # Both generators go to test execution
-        graph.add_edge("rule_generation", "test_execution") 
-        graph.add_edge("llm_generation", "test_execution")
-        
-        # Test execution goes to decision
-        graph.add_edge("test_execution", "decision")
-        
-        # Conditional routing after decision
-        graph.add_conditional_edges("decision", route_after_decision)
-        
-        return graph.compile()
     
     def _execute_workflow_simple(self, state: Dict) -> Dict:
         """Execute workflow with proper feedback loop and multiple attempts."""
-        # Import node functions
-        try:
-            from nodes.analysis_node import analysis_node
-            from nodes.strategy_node import strategy_node  
-            from nodes.rule_based_generator import rule_based_generator_node
-            from nodes.llm_generator_node import llm_generator_node
-            from nodes.test_execution_node import test_execution_node
-        except ImportError as e:
-            print(f"Import error: {e}")
-            # Fallback - use the existing instances if available
-            analysis_node = self._get_node_function('analysis')
-            strategy_node = self._get_node_function('strategy')
-            rule_based_generator_node = self._get_node_function('rule_generation')
-            llm_generator_node = self._get_node_function('llm_generation')
-            test_execution_node = self._get_node_function('test_execution')
-        
         max_attempts = state.get('max_attempts', 3)
-        print(f"🚀 Starting workflow with max {max_attempts} attempts")
+        log.info("🚀 Starting workflow with max %d attempts", max_attempts)
         
         # Initial analysis (once)
-        print("🔍 Analyzing code...")
+        log.info("🔍 Analyzing code...")
         state = analysis_node(state)
-        print(f"Analysis complete: Bug type = {state.get('code_analysis', {}).get('suspected_bug_type', 'unknown')}")
+        log.info("Analysis complete: Bug type = %s", state.get('code_analysis', {}).get('suspected_bug_type', 'unknown'))
         
         attempts = []
+        previous_errors = []  # Distinct error signatures, in the order first seen
         
         for attempt in range(max_attempts):
-            print(f"\n=== 🔄 ATTEMPT {attempt + 1}/{max_attempts} ===")
+            log.info("\n=== 🔄 ATTEMPT %d/%d ===", attempt + 1, max_attempts)
             state['current_attempt'] = attempt + 1
             
             # Strategy selection with feedback from previous attempts
-            print("🎯 Selecting strategy...")
+            log.info("🎯 Selecting strategy...")
             state['attempts'] = attempts  # Pass previous attempts for feedback
             state = strategy_node(state)
             strategy = state.get('current_strategy', 'rule_based')
-            print(f"Strategy selected: {strategy}")
+            log.info("Strategy selected: %s", strategy)
             
             # Code generation with feedback loop
-            print(f"🔧 Generating code using {strategy} approach...")
+            log.info("🔧 Generating code using %s approach...", strategy)
             if strategy == 'rule_based':
                 state = rule_based_generator_node(state)
             else:
@@ -188,7 +112,7 @@ class CodeFixingAgent:
             # Validate code generation
             candidate_code = state.get('candidate_code', '').strip()
             if not candidate_code:
-                print(f"⚠️ No code generated in attempt {attempt + 1}")
+                log.warning("⚠️ No code generated in attempt %d", attempt + 1)
                 # Create failed attempt record
                 attempt_record = {
                     'attempt_num': attempt + 1,
@@ -199,17 +123,19 @@ class CodeFixingAgent:
                     'confidence': 0.0,
                     'success': False
                 }
-                attempts.append(attempt_record)
+                self._record_attempt(state, attempts, attempt_record)
                 continue
             
-            print(f"✅ Code generated ({len(candidate_code)} chars)")
-            print(f"Preview: {candidate_code[:100]}...")
+            log.info("✅ Code generated (%d chars)", len(candidate_code))
+            log.debug("Preview: %.100s...", candidate_code)
             
             # Test execution
-            print("🧪 Running tests...")
+            log.info("🧪 Running tests...")
             state = test_execution_node(state)
             
-            # Process test results
+            # Process test results; with several sampled candidates the
+            # test node keeps the one that did best
+            candidate_code = state.get('candidate_code', candidate_code)
             test_result = state.get('test_result', {})
             success = test_result.get('passed', False)
             
@@ -218,43 +144,40 @@ class CodeFixingAgent:
                 'attempt_num': attempt + 1,
                 'candidate_code': candidate_code,
                 'test_result': test_result,
-                'reasoning': state.get('reasoning', '') + " " + state.get('llm_reasoning', ''),
+                'reasoning': " ".join(filter(None, (state.get('reasoning'), state.get('llm_reasoning')))),
                 'strategy_used': strategy,
                 'confidence': state.get('confidence_score', 0.0),
                 'rule_based_fix': state.get('rule_based_fix', False),
                 'success': success
             }
-            attempts.append(attempt_record)
+            self._record_attempt(state, attempts, attempt_record)
             
             if success:
-                print(f"🎉 ATTEMPT {attempt + 1} SUCCEEDED!")
+                log.info("🎉 ATTEMPT %d SUCCEEDED!", attempt + 1)
                 state['final_status'] = 'solved'
                 state['done'] = True
                 state['attempts'] = attempts
                 break
             else:
                 error_msg = test_result.get('log', 'Unknown error')
-                print(f"❌ ATTEMPT {attempt + 1} FAILED: {error_msg[:150]}...")
+                log.info("❌ ATTEMPT %d FAILED: %.150s...", attempt + 1, error_msg)
+                signature = _error_signature(error_msg)
+                if signature not in previous_errors:
+                    previous_errors.append(signature)
                 
                 # FEEDBACK ANALYSIS: Learn from failure
                 if attempt < max_attempts - 1:  # Not the last attempt
-                    print(f"🔍 Analyzing failure for next attempt...")
+                    log.info("🔍 Analyzing failure for next attempt...")
                     
                     # Provide feedback context for next attempt
                     failure_feedback = self._generate_failure_feedback(attempt_record, attempts)
                     state['failure_feedback'] = failure_feedback
-                    state['previous_errors'] = [a['test_result'].get('log', '') for a in attempts if not a['success']]
+                    state['previous_errors'] = previous_errors
                     
-                    print(f"📝 Feedback generated: {failure_feedback[:100]}...")
+                    log.debug("📝 Feedback generated: %.100s...", failure_feedback)
                 
                 # Reset state for next attempt but preserve learning
-                state['candidate_code'] = ''
-                state['reasoning'] = ''
-                state['llm_reasoning'] = ''
-                state['confidence_score'] = 0.0
-                state['rule_based_fix'] = False
-                state['code_generated'] = False
-                state['tests_executed'] = False
+                state.update(_ATTEMPT_SCRATCH)
         
         # Final processing
         state['attempts'] = attempts
@@ -262,13 +185,24 @@ class CodeFixingAgent:
         if not state.get('done', False):
             state['final_status'] = 'unsolved'
             state['done'] = True
-            print(f"❌ All {max_attempts} attempts failed")
+            log.info("❌ All %d attempts failed", max_attempts)
         
         total_attempts = len(attempts)
-        print(f"\n📊 Summary: {total_attempts} attempts made, Status: {state.get('final_status', 'unknown')}")
+        log.info("\n📊 Summary: %d attempts made, Status: %s", total_attempts, state.get('final_status', 'unknown'))
         
         return state
     
+    def _record_attempt(self, state: Dict, attempts: List[Dict], attempt_record: Dict):
+        """
+        Add an attempt to the history and append it to the task's attempts.jsonl,
+        so finished attempts survive a crash before execution_log.json is written.
+        """
+        attempts.append(attempt_record)
+        task_dir = state.get('task_dir')
+        if task_dir:
+            with open(os.path.join(task_dir, "attempts.jsonl"), 'ab') as f:
+                f.write(dumps_line(attempt_record))
+    
     def _generate_failure_feedback(self, failed_attempt: Dict, all_attempts: List[Dict]) -> str:
         """Generate feedback for the next attempt based on previous failures."""
         candidate_code = failed_attempt.get('candidate_code', '')
@@ -279,16 +213,10 @@ class CodeFixingAgent:
         feedback_parts = []
         
         # Error type analysis
-        if 'SyntaxError' in error_log:
-            feedback_parts.append("SYNTAX ERROR DETECTED: Check for missing colons, parentheses, or indentation issues.")
-        elif 'NameError' in error_log:
-            feedback_parts.append("NAME ERROR: Variable or function name not defined correctly.")
-        elif 'TypeError' in error_log:
-            feedback_parts.append("TYPE ERROR: Check function parameters and return types.")
-        elif 'AssertionError' in error_log:
-            feedback_parts.append("LOGIC ERROR: The function logic is incorrect - review the algorithm.")
-        elif 'IndentationError' in error_log:
-            feedback_parts.append("INDENTATION ERROR: Fix the code indentation.")
+        for needle, message in _ERROR_FEEDBACK:
+            if needle in error_log:
+                feedback_parts.append(message)
+                break
         
         # Pattern analysis from code
         if candidate_code:
@@ -307,33 +235,17 @@ class CodeFixingAgent:
         
         # Previous attempt patterns
         if len(all_attempts) > 1:
-            prev_errors = [a['test_result'].get('log', '') for a in all_attempts if not a['success']]
-            if len(set(prev_errors)) == 1:
+            # Every failed attempt logged the same error; stops at the first difference
+            prev_errors = (a['test_result'].get('log', '') for a in all_attempts if not a['success'])
+            first_error = next(prev_errors, None)
+            if first_error is not None and all(log == first_error for log in prev_errors):
                 feedback_parts.append("REPEATED ERROR: Same error as before - try completely different approach.")
         
         return " ".join(feedback_parts) if feedback_parts else "General failure - review approach."
     
-    def _get_node_function(self, node_name: str):
-        """Get node function from the graph if available."""
-        if hasattr(self, 'graph') and hasattr(self.graph, 'nodes'):
-            return self.graph.nodes.get(node_name, lambda x: x)
-        return lambda x: x  # No-op fallback
-        
-        # Final decision
-        if not state.get('done', False):
-            state['final_status'] = 'unsolved'
-            state['done'] = True
-            print(f"❌ All {max_attempts} attempts failed")
-        
-        total_attempts = len(state.get('attempts', []))
-        print(f"\n📊 Summary: {total_attempts} attempts made, Status: {state.get('final_status', 'unknown')}")
-            
-        return state
-    
     def _create_task_directory(self, task_id: str) -> str:
         """Create a unique directory for this task."""
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        task_dir = self.base_dir / f"{task_id}_{timestamp}"
+        task_dir = self.base_dir / f"{task_id}_{_RUN_TS}_{_next_id()}"
         task_dir.mkdir(parents=True, exist_ok=True)
         return str(task_dir)
     
@@ -344,7 +256,9 @@ class CodeFixingAgent:
                  task_prompt: str = "",
                  canonical_solution: str = None,
                  bug_type: str = "unknown",
-                 max_attempts: int = 3) -> Dict[str, Any]:
+                 max_attempts: int = 3,
+                 num_candidates: int = 1,
+                 reuse_interpreter: bool = False) -> Dict[str, Any]:
         """
         Fix buggy code using the agentic workflow.
         
@@ -356,6 +270,8 @@ class CodeFixingAgent:
             canonical_solution: Optional correct solution for reference
             bug_type: Type of bug if known
             max_attempts: Maximum number of fix attempts
+            num_candidates: Fixes sampled per LLM attempt; all are tested
+            reuse_interpreter: Test candidates in a persistent worker interpreter
             
         Returns:
             Dictionary containing results and execution trace
@@ -377,6 +293,8 @@ class CodeFixingAgent:
             # Execution control
             'current_attempt': 0,
             'max_attempts': max_attempts,
+            'num_candidates': num_candidates,
+            'reuse_interpreter': reuse_interpreter,
             'attempts': [],
             'task_dir': task_dir,
             
@@ -428,24 +346,50 @@ class CodeFixingAgent:
     
     def _save_execution_log(self, state: Dict, task_dir: str):
         """Save detailed execution log for analysis."""
-        import json
-        
         log_file = Path(task_dir) / "execution_log.json"
         
-        # Create a serializable version of the state
-        serializable_state = {}
-        for key, value in state.items():
-            try:
-                json.dumps(value)  # Test if serializable
-                serializable_state[key] = value
-            except (TypeError, ValueError):
-                serializable_state[key] = str(value)
+        # Values JSON cannot represent are stringified where they occur
+        write_json(str(log_file), state, default=str)
+    
+    def _evaluate_problem(self, problem: Dict, index: int, total_problems: int, max_attempts: int) -> Dict:
+        """Run the agent on one dataset problem and return its result summary."""
+        task_id = problem.get('task_id', f'problem_{index}')
+        log.info("\nEvaluating problem %d/%d: %s", index + 1, total_problems, task_id)
         
-        with open(log_file, 'w') as f:
-            json.dump(serializable_state, f, indent=2)
+        try:
+            result = self.fix_code(
+                buggy_code=problem['buggy_solution'],
+                tests=problem['test'],
+                task_id=task_id.replace('/', '_'),
+                task_prompt=problem.get('prompt', problem.get('docstring', '')),
+                canonical_solution=problem.get('canonical_solution'),
+                bug_type=problem.get('bug_type', 'unknown'),
+                max_attempts=max_attempts
+            )
+        except Exception as e:
+            log.exception("Error evaluating problem %d: %s", index, e)
+            return {
+                'task_id': task_id,
+                'final_status': 'error',
+                'error': str(e),
+                'attempts': 0
+            }
+        
+        attempts_made = len(result.get('attempts', []))
+        return {
+            'task_id': task_id,
+            'bug_type': problem.get('bug_type'),
+            'final_status': result['final_status'],
+            'attempts': attempts_made,
+            'total_time': result.get('total_time', 0),
+            'llm_calls': result.get('llm_calls', 0),
+            'task_dir': result.get('task_dir'),
+            'first_attempt_success': attempts_made > 0 and result.get('attempts', [{}])[0].get('test_result', {}).get('passed', False)
+        }
     
     def evaluate_on_dataset(self, dataset_path: str, output_path: str, max_problems: int = None, 
-                           task_range: tuple = None, max_attempts: int = 3):
+                           task_range: tuple = None, max_attempts: int = 3, max_workers: int = 1,
+                           byte_range: tuple = None, generation_batch_size: int = 1):
         """
         Evaluate the agent on a HumanEvalFix dataset.
         
@@ -455,95 +399,119 @@ class CodeFixingAgent:
             max_problems: Maximum number of problems to evaluate (None for all)
             task_range: Tuple (start, end) for task range selection
             max_attempts: Maximum attempts per task
+            max_workers: Number of worker processes; each worker builds its own
+                agent (and model), so keep this at 1 for a single small GPU
+            byte_range: Optional (start, end) byte window of the dataset file; only
+                records whose line starts inside it are evaluated, so independent
+                jobs can each take one chunk of a large file
+            generation_batch_size: With a single worker, run this many tasks
+                concurrently and batch their LLM generations (see BatchedAgent)
         """
-        import json
-        
-        # Load dataset
-        problems = []
-        with open(dataset_path, 'r') as f:
-            for line in f:
-                if line.strip():
-                    problems.append(json.loads(line))
-        
-        # Apply task range filter
+        # Select tasks by byte offset without parsing; records are parsed one at a time
+        if byte_range:
+            log.info("Selected byte range %d to %d", *byte_range)
         if task_range:
             start, end = task_range
-            problems = problems[start:end+1]  # +1 to include end index
-            print(f"Selected tasks {start} to {end}")
-        elif max_problems:
-            problems = problems[:max_problems]
-        
-        print(f"Evaluating on {len(problems)} problems with max {max_attempts} attempts each...")
+            stop = end + 1  # +1 to include end index
+            log.info("Selected tasks %d to %d", start, end)
+        else:
+            start, stop = 0, max_problems or None
+
+        offsets = select_offsets(dataset_path, start, stop, byte_range)
+        total_problems = len(offsets)
+
+        log.info("Evaluating on %d problems with max %d attempts each...", total_problems, max_attempts)
         
         results = []
         solved_count = 0
+        solved_first = 0
         total_attempts = 0
         total_time = 0
         
-        for i, problem in enumerate(problems):
-            task_id = problem.get('task_id', f'problem_{i}')
-            print(f"\nEvaluating problem {i+1}/{len(problems)}: {task_id}")
-            
-            try:
-                result = self.fix_code(
-                    buggy_code=problem['buggy_solution'],
-                    tests=problem['test'],
-                    task_id=task_id.replace('/', '_'),
-                    task_prompt=problem.get('prompt', problem.get('docstring', '')),
-                    canonical_solution=problem.get('canonical_solution'),
-                    bug_type=problem.get('bug_type', 'unknown'),
-                    max_attempts=max_attempts
-                )
+        # Progress is appended per task to a JSONL sidecar (O(1) per task) plus a
+        # small counts-only summary; the full results file is written once at the end.
+        # The sidecar is truncated at the start of every run, so after a crash it
+        # holds exactly the tasks this run finished; nothing reads it back to resume
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        partial_path = output_path + ".partial.jsonl"
+        progress_path = output_path + ".progress.json"
+        partial_file = open(partial_path, 'wb')
+        
+        pool = None
+        dataset = None
+        if max_workers > 1:
+            # Tasks are independent, so fan them out; map() keeps dataset order.
+            # Workers map the dataset themselves and parse records by byte offset,
+            # so the parent only ships integers instead of pickled task dicts
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_eval_worker,
+                initargs=(str(self.base_dir), dataset_path)
+            )
+            summaries = pool.map(
+                _evaluate_problem_in_worker, offsets, count(),
+                repeat(total_problems), repeat(max_attempts)
+            )
+        elif offsets:
+            dataset = map_jsonl(dataset_path)
+            problems = (read_record(dataset, offset) for offset in offsets)
+            if generation_batch_size > 1:
+                summaries = BatchedAgent(self, generation_batch_size).evaluate(
+                    problems, total_problems, max_attempts)
+            else:
+                summaries = (self._evaluate_problem(problem, i, total_problems, max_attempts)
+                             for i, problem in enumerate(problems))
+        else:
+            summaries = ()
+        
+        try:
+            for i, result_summary in enumerate(summaries):
+                results.append(result_summary)
+                partial_file.write(dumps_line(result_summary))
+                partial_file.flush()
                 
-                if result['final_status'] == 'solved':
+                if result_summary['final_status'] == 'solved':
                     solved_count += 1
-                
-                attempts_made = len(result.get('attempts', []))
-                total_attempts += attempts_made
-                total_time += result.get('total_time', 0)
-                
-                # Store result summary
-                result_summary = {
-                    'task_id': task_id,
-                    'bug_type': problem.get('bug_type'),
-                    'final_status': result['final_status'],
-                    'attempts': attempts_made,
-                    'total_time': result.get('total_time', 0),
-                    'llm_calls': result.get('llm_calls', 0),
-                    'task_dir': result.get('task_dir'),
-                    'first_attempt_success': attempts_made > 0 and result.get('attempts', [{}])[0].get('test_result', {}).get('passed', False)
-                }
-                
-                results.append(result_summary)
+                if result_summary.get('first_attempt_success'):
+                    solved_first += 1
+                total_attempts += result_summary['attempts']
+                total_time += result_summary.get('total_time', 0)
+                write_json(progress_path, {
+                    'completed': i + 1,
+                    'total_problems': total_problems,
+                    'solved': solved_count,
+                    'solved_first': solved_first,
+                    'total_attempts': total_attempts,
+                    'total_time': total_time
+                })
+                if result_summary['final_status'] == 'error':
+                    continue
                 
                 # Print progress
-                pass_rate = solved_count / (i + 1)
-                avg_attempts = total_attempts / (i + 1)
-                print(f"Status: {result['final_status']}, Attempts: {attempts_made}")
-                print(f"Pass rate so far: {pass_rate:.3f}, Avg attempts: {avg_attempts:.1f}")
-                
-            except Exception as e:
-                print(f"Error evaluating problem {i}: {e}")
-                import traceback
-                traceback.print_exc()
-                results.append({
-                    'task_id': task_id,
-                    'final_status': 'error',
-                    'error': str(e),
-                    'attempts': 0
-                })
-        
-        # Calculate metrics
-        pass_at_1 = sum(1 for r in results if r.get('first_attempt_success', False)) / len(results) if results else 0
-        pass_at_k = solved_count / len(results) if results else 0
-        avg_attempts = total_attempts / len(results) if results else 0
+                completed = i + 1
+                log.info("Status: %s, Attempts: %d", result_summary['final_status'], result_summary['attempts'])
+                log.info("Pass rate so far: %.3f, Pass@1 so far: %.3f, Avg attempts: %.1f",
+                         solved_count / completed, solved_first / completed, total_attempts / completed)
+        finally:
+            partial_file.close()
+            if pool is not None:
+                pool.shutdown()
+            if dataset is not None:
+                dataset.close()
+        
+        # Calculate metrics from the running counters
+        completed = len(results)
+        pass_at_1 = solved_first / completed if completed else 0
+        pass_at_k = solved_count / completed if completed else 0
+        avg_attempts = total_attempts / completed if completed else 0
         
         # Save results
         final_results = {
             'dataset': dataset_path,
             'task_range': f"{task_range[0]}-{task_range[1]}" if task_range else "all",
+            'byte_range': list(byte_range) if byte_range else None,
             'max_attempts': max_attempts,
-            'total_problems': len(problems),
+            'total_problems': total_problems,
             'solved': solved_count,
             'pass_rate': pass_at_k,
             'pass_at_1': pass_at_1,
@@ -553,25 +521,69 @@ class CodeFixingAgent:
             'results': results
         }
         
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w') as f:
-            json.dump(final_results, f, indent=2)
+        write_json(output_path, final_results)
         
         print(f"\nEvaluation complete!")
-        print(f"Pass@1: {pass_at_1:.3f} ({sum(1 for r in results if r.get('first_attempt_success', False))}/{len(results)})")
-        print(f"Pass@{max_attempts}: {pass_at_k:.3f} ({solved_count}/{len(results)})")
+        print(f"Pass@1: {pass_at_1:.3f} ({solved_first}/{completed})")
+        print(f"Pass@{max_attempts}: {pass_at_k:.3f} ({solved_count}/{completed})")
         print(f"Average attempts: {avg_attempts:.1f}")
         print(f"Total time: {total_time:.1f}s")
         print(f"Results saved to: {output_path}")
         
         return final_results
 
+class BatchedAgent:
+    """
+    Runs up to `batch_size` tasks concurrently on one CodeFixingAgent and
+    batches their LLM generations.
+    
+    Each task runs its normal attempt loop in its own thread. Generation
+    requests from every attempt round go through a BatchingGenerator, which
+    sends them to the model together; test subprocesses and rule-based
+    attempts of other tasks overlap with decoding meanwhile.
+    """
+    
+    def __init__(self, agent: CodeFixingAgent, batch_size: int = 8):
+        self.agent = agent
+        self.batch_size = batch_size
+        self.batcher = BatchingGenerator(get_generator(DEFAULT_MODEL_ID, DEFAULT_PRECISION), batch_size)
+    
+    def _run_task(self, problem: Dict, index: int, total_problems: int, max_attempts: int) -> Dict:
+        with self.batcher.task():
+            return self.agent._evaluate_problem(problem, index, total_problems, max_attempts)
+    
+    def evaluate(self, problems: Iterable[Dict], total_problems: int, max_attempts: int) -> Iterator[Dict]:
+        """Evaluate problems with at most batch_size in flight; results keep dataset order."""
+        with use_generator(self.batcher), ThreadPoolExecutor(max_workers=self.batch_size) as pool:
+            in_flight = deque()
+            for index, problem in enumerate(problems):
+                in_flight.append(pool.submit(self._run_task, problem, index, total_problems, max_attempts))
+                if len(in_flight) >= self.batch_size:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+# Per-process agent and dataset mapping used by evaluate_on_dataset's worker pool
+_worker_agent = None
+_worker_dataset = None
+
+def _init_eval_worker(base_dir: str, dataset_path: str):
+    """Build one agent and map the dataset once per worker process."""
+    global _worker_agent, _worker_dataset
+    _worker_agent = CodeFixingAgent(base_dir=base_dir)
+    _worker_dataset = map_jsonl(dataset_path)
+
+def _evaluate_problem_in_worker(offset: int, index: int, total_problems: int, max_attempts: int) -> Dict:
+    problem = read_record(_worker_dataset, offset)
+    return _worker_agent._evaluate_problem(problem, index, total_problems, max_attempts)
+
 # Legacy compatibility function
-def run_fix_agent_for_example(buggy_code: str, tests: str, task_id: str = "task", task_prompt: str = "") -> Dict:
+def run_fix_agent_for_example(buggy_code: str, tests: str, task_id: str = "task", task_prompt: str = "",
+                              agent: CodeFixingAgent = None) -> Dict:
     """
     Legacy compatibility function for existing CLI.
     """
-    agent = CodeFixingAgent()
+    agent = agent or CodeFixingAgent()
     result = agent.fix_code(buggy_code, tests, task_id, task_prompt)
     
     # Convert to legacy format
@@ -581,4 +593,30 @@ def run_fix_agent_for_example(buggy_code: str, tests: str, task_id: str = "task"
         'history': result.get('attempts', [])
     }
     
-    return legacy_result
\ No newline at end of file
+    return legacy_result
+
+async def run_many(examples: List[Dict], max_concurrency: int = 4) -> List[Any]:
+    """
+    Run run_fix_agent_for_example over many examples concurrently.
+    
+    Each example is a dict of run_fix_agent_for_example keyword arguments
+    (buggy_code, tests, optional task_id and task_prompt). Up to
+    max_concurrency examples run at once in worker threads sharing one agent,
+    so one example's test subprocess overlaps with another's generation; their
+    model calls are merged by a BatchingGenerator. Results keep input order and
+    a failed example yields its exception, as with gather(return_exceptions=True).
+    """
+    agent = CodeFixingAgent()
+    batcher = BatchingGenerator(get_generator(DEFAULT_MODEL_ID, DEFAULT_PRECISION), max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    def run(example: Dict) -> Dict:
+        with batcher.task():
+            return run_fix_agent_for_example(agent=agent, **example)
+    
+    async def run_limited(example: Dict) -> Dict:
+        async with semaphore:
+            return await asyncio.to_thread(run, example)
+    
+    with use_generator(batcher):
+        return await asyncio.gather(*(run_limited(e) for e in examples), return_exceptions=True)